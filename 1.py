@@ -1,7 +1,7 @@
 import streamlit as st
 from datetime import datetime
-import os
-import json
+from demo_store import JournalStore, SharedPlaceStore
+from backend.image_store import InvalidImage, ingest, variant_path # standard library only, Pillow on first use
 
 # --- Page Configuration ---
 st.set_page_config(
@@ -10,91 +10,68 @@ st.set_page_config(
     layout="wide"
 )
 
-# --- Simulating a Database using Session State ---
-# This initializes the 'database' only once per session.
-def initialize_database():
-    if 'initialized' not in st.session_state:
-        st.session_state.initialized = True
-        
-        # Simulates the 'Users' table
-        st.session_state.users = {
-            "s_rao": {"name": "S. Rao", "contributions": 2, "badge": "Heritage Keeper 🏅"},
-            "priya_k": {"name": "Priya K.", "contributions": 1, "badge": "Storyteller 📖"},
-            "admin": {"name": "Admin", "contributions": 0, "badge": "Curator 🏛️"}
-        }
-        
-        # Load places from JSON if exists, else use default
-        if os.path.exists("stories.json"):
-            try:
-                with open("stories.json", "r", encoding="utf-8") as f:
-                    content = f.read().strip()
-                    if content:
-                        st.session_state.places = json.loads(content)
-                    else:
-                        raise ValueError("Empty file")
-            except (json.JSONDecodeError, ValueError):
-                # If file is empty or invalid, fall back to default and recreate file
-                st.session_state.places = {
-                    "wgl_fort": {
-                        "name": "Warangal Fort (వరంగల్ కోట)",
-                        "type": "Fortress",
-                        "region": "Warangal",
-                        "era": "12th Century CE",
-                        "contributor_id": "s_rao",
-                        "image": "https://upload.wikimedia.org/wikipedia/commons/a/a8/Warangal_Fort_Entrance.jpg",
-                        "story": "The fort was the capital of the Kakatiya dynasty. The intricate stone gateways, known as Kakatiya Kala Thoranam, are an architectural marvel and have become a symbol of Telangana.",
-                        "tags": ["Kakatiya", "Stone Archway", "Archaeology"],
-                        "comments": [
-                            {"user": "Priya K.", "text": "The detail on the arches is incredible!"}
-                        ]
-                    },
-                    "chowmahalla": {
-                        "name": "Chowmahalla Palace (చౌమహల్లా ప్యాలెస్)",
-                        "type": "Traditional Home (Palace)",
-                        "region": "Hyderabad",
-                        "era": "18th-19th Century CE",
-                        "contributor_id": "priya_k",
-                        "image": "https://upload.wikimedia.org/wikipedia/commons/thumb/c/ca/Chowmahalla_Palace_Hyderabad_India.jpg/1280px-Chowmahalla_Palace_Hyderabad_India.jpg",
-                        "story": "This was the seat of the Asaf Jahi dynasty and the official residence of the Nizams of Hyderabad. Its name means 'Four Palaces'. The grand Khilwat Mubarak hall is breathtaking.",
-                        "tags": ["Nizam", "Courtyard", "Palace"],
-                        "comments": []
-                    },
-                }
-                with open("stories.json", "w", encoding="utf-8") as f:
-                    json.dump(st.session_state.places, f, ensure_ascii=False, indent=2)
-        else:
-            # Simulates the 'Homes' and 'Forts' tables with stories
-            st.session_state.places = {
-                "wgl_fort": {
-                    "name": "Warangal Fort (వరంగల్ కోట)",
-                    "type": "Fortress",
-                    "region": "Warangal",
-                    "era": "12th Century CE",
-                    "contributor_id": "s_rao",
-                    "image": "https://upload.wikimedia.org/wikipedia/commons/a/a8/Warangal_Fort_Entrance.jpg",
-                    "story": "The fort was the capital of the Kakatiya dynasty. The intricate stone gateways, known as Kakatiya Kala Thoranam, are an architectural marvel and have become a symbol of Telangana.",
-                    "tags": ["Kakatiya", "Stone Archway", "Archaeology"],
-                    "comments": [
-                        {"user": "Priya K.", "text": "The detail on the arches is incredible!"}
-                    ]
-                },
-                "chowmahalla": {
-                    "name": "Chowmahalla Palace (చౌమహల్లా ప్యాలెస్)",
-                    "type": "Traditional Home (Palace)",
-                    "region": "Hyderabad",
-                    "era": "18th-19th Century CE",
-                    "contributor_id": "priya_k",
-                    "image": "https://upload.wikimedia.org/wikipedia/commons/thumb/c/ca/Chowmahalla_Palace_Hyderabad_India.jpg/1280px-Chowmahalla_Palace_Hyderabad_India.jpg",
-                    "story": "This was the seat of the Asaf Jahi dynasty and the official residence of the Nizams of Hyderabad. Its name means 'Four Palaces'. The grand Khilwat Mubarak hall is breathtaking.",
-                    "tags": ["Nizam", "Courtyard", "Palace"],
-                    "comments": []
-                },
-            }
+# --- Simulating a Database ---
+# Sample data used when stories.json is missing, empty or invalid
+DEFAULT_PLACES = {
+    "wgl_fort": {
+        "name": "Warangal Fort (వరంగల్ కోట)",
+        "type": "Fortress",
+        "region": "Warangal",
+        "era": "12th Century CE",
+        "contributor_id": "s_rao",
+        "image": "https://upload.wikimedia.org/wikipedia/commons/a/a8/Warangal_Fort_Entrance.jpg",
+        "story": "The fort was the capital of the Kakatiya dynasty. The intricate stone gateways, known as Kakatiya Kala Thoranam, are an architectural marvel and have become a symbol of Telangana.",
+        "tags": ["Kakatiya", "Stone Archway", "Archaeology"],
+        "comments": [
+            {"user": "Priya K.", "text": "The detail on the arches is incredible!"}
+        ]
+    },
+    "chowmahalla": {
+        "name": "Chowmahalla Palace (చౌమహల్లా ప్యాలెస్)",
+        "type": "Traditional Home (Palace)",
+        "region": "Hyderabad",
+        "era": "18th-19th Century CE",
+        "contributor_id": "priya_k",
+        "image": "https://upload.wikimedia.org/wikipedia/commons/thumb/c/ca/Chowmahalla_Palace_Hyderabad_India.jpg/1280px-Chowmahalla_Palace_Hyderabad_India.jpg",
+        "story": "This was the seat of the Asaf Jahi dynasty and the official residence of the Nizams of Hyderabad. Its name means 'Four Palaces'. The grand Khilwat Mubarak hall is breathtaking.",
+        "tags": ["Nizam", "Courtyard", "Palace"],
+        "comments": []
+    },
+}
+
+# Simulates the 'Users' table
+DEFAULT_USERS = {
+    "s_rao": {"name": "S. Rao", "contributions": 2, "badge": "Heritage Keeper 🏅"},
+    "priya_k": {"name": "Priya K.", "contributions": 1, "badge": "Storyteller 📖"},
+    "admin": {"name": "Admin", "contributions": 0, "badge": "Curator 🏛️"}
+}
+
+# One copy of the archive per process, shared by every browser session.
+# Places come from the stories.json snapshot plus the submission journal.
+@st.cache_resource
+def get_store():
+    return SharedPlaceStore(JournalStore("stories.json", default_places=DEFAULT_PLACES), DEFAULT_USERS)
+
+# Uploaded photos are stored once per content hash, with thumbnails made on upload
+DEMO_MEDIA_DIR = "demo_media"
+
+def save_photos(uploaded_files):
+    """Returns (full-size path, thumbnail path) per photo; paths are relative to the working directory."""
+    saved = []
+    for uploaded in uploaded_files:
+        meta, _ = ingest(DEMO_MEDIA_DIR, uploaded.getvalue())
+        saved.append((variant_path(DEMO_MEDIA_DIR, meta["id"], "lg"), variant_path(DEMO_MEDIA_DIR, meta["id"], "md")))
+    return saved
 
 # --- Main Application ---
 
-# Initialize the 'database' on first run
-initialize_database()
+store = get_store()
+# Replay any submissions appended by other processes (a stat call when there are none)
+store.refresh()
+store_version, places, users = store.snapshot()
+if st.session_state.get("store_version", store_version) != store_version:
+    st.toast("New stories have been added to the archive.")
+st.session_state.store_version = store_version
 
 # --- Header and Title ---
 st.title("గడులు & గృహాలు | Fortresses & Traditional Homes")
@@ -106,8 +83,7 @@ st.sidebar.title("Navigation")
 
 # Simple user simulation - no real authentication
 username_input = st.sidebar.text_input("Enter your name to contribute:", "Guest")
-if username_input not in st.session_state.users:
-    st.session_state.users[username_input.lower()] = {"name": username_input, "contributions": 0, "badge": "New Contributor ✨"}
+store.ensure_user(username_input.lower(), username_input)
 
 # Navigation Radio Buttons
 page = st.sidebar.radio(
@@ -125,32 +101,34 @@ if page == "Explore Heritage":
     st.header("Explore Our Heritage Collection")
 
     # --- Filtering Controls ---
+    # Dropdown values and counts are computed once per change in the shared store, not per rerun
     col1, col2, col3 = st.columns(3)
     with col1:
-        regions = ["All"] + list(set(p["region"] for p in st.session_state.places.values()))
-        selected_region = st.selectbox("Filter by Region:", regions)
+        region_counts = dict(store.facet_counts("region"))
+        selected_region = st.selectbox("Filter by Region:", ["All"] + list(region_counts),
+                                       format_func=lambda v: v if v == "All" else f"{v} ({region_counts[v]})")
     with col2:
-        types = ["All"] + list(set(p["type"] for p in st.session_state.places.values()))
-        selected_type = st.selectbox("Filter by Type:", types)
+        type_counts = dict(store.facet_counts("type"))
+        selected_type = st.selectbox("Filter by Type:", ["All"] + list(type_counts),
+                                     format_func=lambda v: v if v == "All" else f"{v} ({type_counts[v]})")
     with col3:
         search_query = st.text_input("Search by Name or Tag:")
 
-    # --- Filtering Logic ---
-    filtered_places = st.session_state.places.values()
-    if selected_region != "All":
-        filtered_places = [p for p in filtered_places if p["region"] == selected_region]
-    if selected_type != "All":
-        filtered_places = [p for p in filtered_places if p["type"] == selected_type]
-    if search_query:
-        query = search_query.lower()
-        filtered_places = [p for p in filtered_places if query in p["name"].lower() or any(query in tag.lower() for tag in p["tags"])]
+    # --- Filtering Logic: a single pass over the places ---
+    query = search_query.lower()
+    filtered_places = [
+        p for p in places.values()
+        if (selected_region == "All" or p["region"] == selected_region)
+        and (selected_type == "All" or p["type"] == selected_type)
+        and (not query or query in p["name"].lower() or any(query in tag.lower() for tag in p["tags"]))
+    ]
 
     # --- Displaying Data (UI Wireframe Implementation) ---
     if not filtered_places:
         st.warning("No entries match your criteria.")
     else:
         for place in filtered_places:
-            contributor = st.session_state.users.get(place["contributor_id"], {"name": "Unknown", "badge": ""})
+            contributor = users.get(place["contributor_id"], {"name": "Unknown", "badge": ""})
             
             st.markdown("---")
             st.subheader(place["name"])
@@ -158,7 +136,7 @@ if page == "Explore Heritage":
             col1, col2 = st.columns([2, 3])
             
             with col1:
-                st.image(place["image"], caption=f"Type: {place['type']} | Era: {place['era']}")
+                st.image(place.get("thumbnail") or place["image"], caption=f"Type: {place['type']} | Era: {place['era']}")
 
             with col2:
                 st.markdown(f"**Location:** {place['region']}")
@@ -241,24 +219,29 @@ elif page == "Submit a Story":
                     points = story_points.split('\n')
                     story_text = "This historic place holds deep significance. " + " ".join(points) + ". These memories paint a vivid picture of its past."
 
-                st.session_state.places[place_id] = {
+                try:
+                    photos = save_photos(uploaded_images or [])
+                except InvalidImage as e:
+                    st.error(f"Could not read one of the photos: {e}")
+                    st.stop()
+
+                new_place = {
                     "name": place_name,
                     "type": place_type,
                     "region": place_region,
                     "era": place_era,
                     "contributor_id": username_input.lower(),
-                    "image": "https://i.imgur.com/sdVn1iA.png", # Placeholder for uploaded image
+                    "image": photos[0][0] if photos else "https://i.imgur.com/sdVn1iA.png",
+                    "thumbnail": photos[0][1] if photos else None,
+                    "photos": [full for full, _ in photos],
                     "story": story_text,
                     "tags": [tag.strip() for tag in architectural_tags.split(',')] if architectural_tags else [],
                     "comments": []
                 }
                 
-                # Update contributor stats
-                st.session_state.users[username_input.lower()]["contributions"] += 1
-                
-                # --- Save to JSON file ---
-                with open("stories.json", "w", encoding="utf-8") as f:
-                    json.dump(st.session_state.places, f, ensure_ascii=False, indent=2)
+                # --- Save: one fsync'd append to the journal, visible to every session ---
+                store.add_place(place_id, new_place, username_input.lower())
+                st.session_state.store_version = store.version
                 
                 st.success(f"Thank you, {username_input}! Your story about {place_name} has been submitted for review.")
                 st.balloons()
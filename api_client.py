@@ -0,0 +1,75 @@
+# api_client.py
+import logging
+import os
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+logger = logging.getLogger(__name__)
+
+API_CONNECT_TIMEOUT = float(os.environ.get("API_CONNECT_TIMEOUT", "3.05"))
+API_READ_TIMEOUT = float(os.environ.get("API_READ_TIMEOUT", "30"))
+API_RETRIES = int(os.environ.get("API_RETRIES", "3"))
+API_BACKOFF = float(os.environ.get("API_BACKOFF", "0.3"))
+API_POOL_SIZE = int(os.environ.get("API_POOL_SIZE", "20"))
+
+
+class ApiClient:
+    """One keep-alive connection pool to the backend, shared by every Streamlit session in the process.
+
+    Every call has a connect and read timeout. Idempotent requests (GET, HEAD, OPTIONS)
+    are retried with exponential backoff on connection errors and 502/503/504. Other
+    methods are only retried when the connection could not be opened, since then the
+    request never reached the server. Each call's latency is logged at DEBUG, or at
+    WARNING when it takes longer than `slow_ms`.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        connect_timeout: float = API_CONNECT_TIMEOUT,
+        read_timeout: float = API_READ_TIMEOUT,
+        retries: int = API_RETRIES,
+        backoff: float = API_BACKOFF,
+        pool_size: int = API_POOL_SIZE,
+        slow_ms: float = 1000,
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = (connect_timeout, read_timeout)
+        self.slow_ms = slow_ms
+        retry = Retry(
+            total=retries,
+            connect=retries,
+            read=retries,
+            status=retries,
+            backoff_factor=backoff,
+            status_forcelist=(502, 503, 504),
+            allowed_methods=frozenset({"GET", "HEAD", "OPTIONS"}),
+            respect_retry_after_header=True,
+            raise_on_status=False,
+        )
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def request(self, method: str, path: str, **kwargs) -> requests.Response:
+        kwargs.setdefault("timeout", self.timeout)
+        started = time.perf_counter()
+        status = "error"
+        try:
+            response = self.session.request(method, f"{self.base_url}{path}", **kwargs)
+            status = response.status_code
+            return response
+        finally:
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            level = logging.WARNING if elapsed_ms >= self.slow_ms else logging.DEBUG
+            logger.log(level, "%s %s -> %s in %.0f ms", method, path, status, elapsed_ms)
+
+    def get(self, path: str, **kwargs) -> requests.Response:
+        return self.request("GET", path, **kwargs)
+
+    def post(self, path: str, **kwargs) -> requests.Response:
+        return self.request("POST", path, **kwargs)
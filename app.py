@@ -3,13 +3,23 @@ import requests
 import pandas as pd
 import urllib.parse
 import os
+import json
+import threading
 from dotenv import load_dotenv
 from google.cloud import translate_v2 as translate
+from translation_cache import TranslationCache, translate_batch
+from api_client import ApiClient
+
+try:
+    import folium # Optional: pannable map that reports its visible bounds
+    from streamlit_folium import st_folium
+except ImportError:
+    folium = None
 
 # --- CONFIGURATION & SETUP ---
 # Load environment variables
 load_dotenv(dotenv_path='backend/.env')
-API_URL = "http://127.0.0.1:8000"
+API_URL = os.environ.get("API_URL", "http://127.0.0.1:8000")
 
 st.set_page_config(
     page_title="గడులు & గృహాలు | Fortresses & Homes",
@@ -41,6 +51,7 @@ translations = {
     "about_project": {"en": "About the Project", "te": "ప్రాజెక్ట్ గురించి"},
     "welcome_user": {"en": "Welcome, {username}!", "te": "స్వాగతం, {username}!"},
     "explore_header": {"en": "Explore Our Heritage Collection", "te": "మా వారసత్వ సేకరణను అన్వేషించండి"},
+    "heritage_map": {"en": "Heritage Map", "te": "వారసత్వ పటం"},
     # Add more static text translations here
 }
 # Initialize session state for language
@@ -50,17 +61,22 @@ if 'language' not in st.session_state:
 # Helper function to get translated static text
 def t(key):
     return translations.get(key, {}).get(st.session_state.language, f"[{key}]")
-# Cached function to translate dynamic content using the API
-@st.cache_data
+# Place content arrives already translated from the backend (`lang`). Google Translate is
+# only used for the few messages not in `translations`, batched and kept in an on-disk
+# cache shared by all Streamlit processes, so they survive restarts.
+@st.cache_resource
+def get_translation_cache():
+    return TranslationCache(os.environ.get("TRANSLATION_CACHE_PATH", ".cache/translations.sqlite3"))
+
+def translate_many(texts, target_language):
+    if target_language == 'en' or not translate_client:
+        return {text: text for text in texts}
+    return translate_batch(translate_client, get_translation_cache(), texts, target_language)
+
 def translate_text(text, target_language):
-    if not translate_client or not text:
+    if not text:
         return text
-    try:
-        result = translate_client.translate(text, target_language=target_language, source_language='en')
-        return result['translatedText']
-    except Exception as e:
-        print(f"Translation API failed: {e}")
-        return text # Return original text on failure
+    return translate_many([text], target_language).get(text, text)
 
 # --- Language Toggle Button ---
 col1, col2 = st.columns([10, 1])
@@ -70,20 +86,123 @@ with col2:
     else:
         st.session_state.language = 'en'
 
-# --- DATA LOADING & AUTH FUNCTIONS (No changes needed) ---
+# --- BACKEND CLIENT ---
+# One pooled keep-alive client per process, with timeouts and retries (see api_client.py)
+@st.cache_resource
+def get_api():
+    return ApiClient(API_URL)
+
+# --- DATA LOADING ---
+# Explore shows one page at a time, fetched with the backend's keyset cursors. Pages
+# carry story excerpts only; the full story is a separate call made when a reader opens it.
+# Both are cached per language, so switching back and forth does not fetch anything again.
+EXPLORE_PAGE_SIZE = 10
+# Pages are also kept with their ETags (per process), so refreshing one after the
+# 30 s TTL costs a 304 with an empty body while the archive is unchanged
+MAX_REVALIDATED_PAGES = 200
+
+@st.cache_resource
+def get_page_store():
+    return {"lock": threading.Lock(), "pages": {}}
+
+@st.cache_data(ttl=30)
+def load_page(filters, cursor=None, lang='en', limit=EXPLORE_PAGE_SIZE):
+    """Returns (places, cursor of the next page or None)."""
+    params = {**dict(filters), "lang": lang, "limit": limit, "summary": "true"}
+    if cursor:
+        params["cursor"] = cursor
+    store = get_page_store()
+    key = json.dumps(params, sort_keys=True)
+    with store["lock"]:
+        known = store["pages"].get(key)
+    headers = {"If-None-Match": known["etag"]} if known else {}
+    try:
+        response = get_api().get("/places/", params=params, headers=headers)
+        if response.status_code == 304 and known:
+            return known["places"], known["next_cursor"]
+        response.raise_for_status()
+        places, next_cursor = response.json(), response.headers.get("X-Next-Cursor")
+    except requests.exceptions.RequestException:
+        return [], None
+    if response.headers.get("ETag"):
+        with store["lock"]:
+            pages = store["pages"]
+            pages.pop(key, None)
+            pages[key] = {"etag": response.headers["ETag"], "places": places, "next_cursor": next_cursor}
+            if len(pages) > MAX_REVALIDATED_PAGES:
+                del pages[next(iter(pages))] # Least recently stored
+    return places, next_cursor
+
+@st.cache_data(ttl=300)
+def load_place(place_id, lang='en'):
+    try:
+        response = get_api().get(f"/places/{place_id}", params={"lang": lang})
+        response.raise_for_status()
+        return response.json()
+    except requests.exceptions.RequestException:
+        return None
+
+@st.cache_data(ttl=30)
+def search_places(query, lang='en'):
+    try:
+        response = get_api().get("/places/search", params={"q": query, "lang": lang, "limit": 100})
+        response.raise_for_status()
+        return response.json()
+    except requests.exceptions.RequestException:
+        return []
+
+# Facet values with counts come from a table the backend keeps up to date,
+# so the filter dropdowns cost one small request however large the archive is
+@st.cache_data(ttl=30)
+def load_facets():
+    try:
+        response = get_api().get("/places/facets")
+        response.raise_for_status()
+        return response.json()
+    except requests.exceptions.RequestException:
+        return {}
+
+# The map only asks for the places inside its visible area. Bounds are rounded so
+# small pans reuse the cached response.
+DEFAULT_MAP_BOUNDS = (15.8, 77.2, 19.9, 81.3) # Telangana: south, west, north, east
+
 @st.cache_data(ttl=30)
-def load_data():
+def places_in_bounds(bounds, lang='en'):
+    bbox = ",".join(f"{value:.3f}" for value in bounds)
     try:
-        response = requests.get(f"{API_URL}/places/")
+        response = get_api().get("/places/within", params={"bbox": bbox, "lang": lang})
         response.raise_for_status()
         return response.json()
     except requests.exceptions.RequestException:
         return []
 
+def _clamp_bounds(bounds):
+    south, west, north, east = bounds
+    return (max(south, -90.0), max(west, -180.0), min(north, 90.0), min(east, 180.0))
+
+# Yields story text as the backend streams it (Server-Sent Events)
+def stream_story(place_name, points):
+    # The read timeout applies between chunks, so it bounds stalls rather than the whole story
+    with get_api().post("/ai/generate-story/stream", json={"place_name": place_name, "points": points}, stream=True) as response:
+        response.raise_for_status()
+        response.encoding = "utf-8"
+        event = "message"
+        for line in response.iter_lines(decode_unicode=True):
+            if not line:
+                event = "message"
+            elif line.startswith("event:"):
+                event = line[len("event:"):].strip()
+            elif line.startswith("data:"):
+                data = json.loads(line[len("data:"):])
+                if event == "error":
+                    raise RuntimeError(data.get("detail"))
+                if event == "message":
+                    yield data["text"]
+
 # --- AUTHENTICATION FUNCTIONS ---
 def signup(username, password):
     try:
-        response = requests.post(f"{API_URL}/users/", json={"username": username, "password": password})
+        response = get_api().post("/users/", json={"username": username, "password": password})
         if response.status_code == 200:
             st.success("Signup successful! Please login.")
             return True
@@ -96,10 +215,12 @@ def signup(username, password):
 
 def login(username, password):
     try:
-        response = requests.post(f"{API_URL}/login", data={"username": username, "password": password})
+        response = get_api().post("/login", data={"username": username, "password": password})
         if response.status_code == 200:
             st.session_state.logged_in = True
             st.session_state.username = username
+            # Sent with every write; the backend checks it without another password round
+            st.session_state.access_token = response.json()["access_token"]
             st.success("Login successful!")
             st.rerun()
         else:
@@ -107,52 +228,158 @@ def login(username, password):
     except requests.exceptions.RequestException as e:
         st.error(f"Could not connect to the backend: {e}")
 
+def auth_headers():
+    token = st.session_state.get("access_token")
+    return {"Authorization": f"Bearer {token}"} if token else {}
+
+def media_url(url):
+    # Uploaded images are served by the backend under /images/; hotlinked URLs are absolute
+    return urllib.parse.urljoin(API_URL, url) if url and url.startswith("/") else url
+
+def upload_image(uploaded_file):
+    """Sends a photo to POST /images and returns the URL to store as the place's image_url."""
+    response = get_api().post(
+        "/images",
+        files={"file": (uploaded_file.name, uploaded_file.getvalue(), uploaded_file.type)},
+        headers=auth_headers(),
+    )
+    response.raise_for_status()
+    return response.json()["url"]
+
+# --- EXPLORE PAGE ---
+def go_to_page(index, cursor=None):
+    """on_click of the Explore pager; remembers the cursor of each page reached, for going back."""
+    cursors = st.session_state.explore_cursors
+    if cursor is not None and index == len(cursors):
+        cursors.append(cursor)
+    st.session_state.explore_page = index
+
+def render_pager(page_index, next_cursor):
+    previous, label, following = st.columns([1, 2, 1])
+    with previous:
+        st.button("← Previous", key="explore_previous", disabled=page_index == 0, on_click=go_to_page, args=(page_index - 1,))
+    with label:
+        st.caption(f"Page {page_index + 1}")
+    with following:
+        st.button("Next →", key="explore_next", disabled=next_cursor is None, on_click=go_to_page, args=(page_index + 1, next_cursor))
+
+def render_place_card(place, lang):
+    st.markdown("---")
+    st.subheader(place['name'])
+    # Search results come with a highlighted snippet; listing pages with a story excerpt
+    if place.get("snippet"):
+        st.caption(place["snippet"].replace("<b>", "**").replace("</b>", "**"))
+    else:
+        st.caption(place['story'])
+    col1, col2 = st.columns([2, 3])
+    with col1:
+        # The 480 px thumbnail of uploaded photos, not the full-size original
+        image = media_url(place.get("thumbnail_url") or place.get("image_url")) or "https://i.imgur.com/sdVn1iA.png"
+        st.image(image, caption=f"Type: {place['type']} | Era: {place['era']}")
+    with col2:
+        location_parts = [place.get('area'), place.get('region')]
+        display_location = ", ".join(filter(None, location_parts))
+        st.markdown(f"**Location:** {display_location}")
+        contributor = place.get("contributor", {})
+        st.markdown(f"**Contributor:** {contributor.get('username', 'Unknown')} {contributor.get('badge', '✨')}")
+        # An expander renders its body even while closed, so the full story is behind a
+        # toggle instead: it is fetched only once a reader turns it on
+        if st.toggle("**Read the Story**", key=f"story_{place['id']}"):
+            detail = load_place(place['id'], lang)
+            st.write(detail['story'] if detail else place['story'])
+        encoded_query = urllib.parse.quote_plus(f"{place['name']}, {display_location}")
+        st.link_button("Locate 📍", f"https://www.google.com/maps?q={encoded_query}")
+
 # --- MAIN APP UI FUNCTION ---
 def main_app():
     st.sidebar.title(t("welcome_user").format(username=st.session_state.username))
     st.sidebar.image("https://i.imgur.com/M6yB5y6.png", width=100)
     
     if st.sidebar.button(t("logout")):
+        try:
+            get_api().post("/logout", headers=auth_headers())
+        except requests.exceptions.RequestException:
+            pass # The token expires on its own
         for key in st.session_state.keys(): del st.session_state[key]
         st.rerun()
 
-    page = st.sidebar.radio(t("go_to"), (t("explore_heritage"), t("submit_story"), t("about_project")))
+    page = st.sidebar.radio(t("go_to"), (t("explore_heritage"), t("heritage_map"), t("submit_story"), t("about_project")))
 
 
     # --- Page 1: Explore Heritage ---
     if page == t("explore_heritage"):
         st.header(t("explore_header"))
-        places_data = load_data()
-        if not places_data:
+        search_query = st.text_input("Search by name, story or tag:")
+        lang = st.session_state.language
+        facets = load_facets()
+        filters = {}
+        for column, (facet, label) in zip(st.columns(4), [("region", "Region"), ("type", "Type"), ("era", "Era"), ("tag", "Tag")]):
+            options = [None] + [item["value"] for item in facets.get(facet, [])]
+            counts = {item["value"]: item["count"] for item in facets.get(facet, [])}
+            with column:
+                choice = st.selectbox(label, options, format_func=lambda v, c=counts: "All" if v is None else f"{v} ({c[v]})", key=f"facet_{facet}")
+            if choice:
+                filters[facet] = choice
+        view = (search_query.strip(), tuple(sorted(filters.items())))
+        if st.session_state.get("explore_view") != view:
+            # A new search or filter starts from the first page; switching language keeps the position
+            st.session_state.explore_view = view
+            st.session_state.explore_cursors = [None]
+            st.session_state.explore_page = 0
+        page_index = st.session_state.explore_page
+        # Place text arrives already translated by the backend for the selected language
+        if view[0]:
+            results = [
+                p for p in search_places(view[0], lang)
+                if all(p.get(facet) == value for facet, value in filters.items() if facet != "tag")
+                and ("tag" not in filters or filters["tag"] in [tag.strip() for tag in (p.get("tags") or "").split(",")])
+            ]
+            # Ranked results come in one response, so they are paged here; the "cursor" is an offset
+            start = page_index * EXPLORE_PAGE_SIZE
+            places_data = results[start:start + EXPLORE_PAGE_SIZE]
+            next_cursor = start + EXPLORE_PAGE_SIZE if len(results) > start + EXPLORE_PAGE_SIZE else None
+        else:
+            places_data, next_cursor = load_page(view[1], st.session_state.explore_cursors[page_index], lang)
+        if not places_data and page_index == 0:
             st.warning(translate_text("No heritage sites found. Be the first to submit one!", st.session_state.language))
         else:
             for place in places_data:
-                st.markdown("---")
-                # Translate dynamic content
-                place_name = translate_text(place['name'], st.session_state.language)
-                place_type = translate_text(place['type'], st.session_state.language)
-                place_era = translate_text(place['era'], st.session_state.language)
-                place_story = translate_text(place['story'], st.session_state.language)
-                
-                st.subheader(place["name"])
-                col1, col2 = st.columns([2, 3])
-                with col1:
-                    image = place.get("image_url") or "https://i.imgur.com/sdVn1iA.png"
-                    st.image(image, caption=f"Type: {place['type']} | Era: {place['era']}")
-                with col2:
-                    location_parts = [place.get('area'), place.get('region')]
-                    display_location = ", ".join(filter(None, location_parts))
-                    st.markdown(f"**Location:** {display_location}")
-                    contributor = place.get("contributor", {})
-                    st.markdown(f"**Contributor:** {contributor.get('username', 'Unknown')} {contributor.get('badge', '✨')}")
-                    with st.expander("**Read the Story**"):
-                        st.write(place["story"])
-                    search_query = f"{place['name']}, {display_location}"
-                    encoded_query = urllib.parse.quote_plus(search_query)
-                    Maps_url = f"https://www.google.com/maps?q={encoded_query}"
-                    st.link_button("Locate 📍", Maps_url)
-
-    # --- Page 2: Submit a Story ---
+                render_place_card(place, lang)
+            st.markdown("---")
+            render_pager(page_index, next_cursor)
+
+    # --- Page 2: Heritage Map ---
+    elif page == t("heritage_map"):
+        st.header(t("heritage_map"))
+        bounds = st.session_state.get("map_bounds", DEFAULT_MAP_BOUNDS)
+        places_data = places_in_bounds(bounds, st.session_state.language)
+        if folium is not None:
+            south, west, north, east = bounds
+            heritage_map = folium.Map()
+            heritage_map.fit_bounds([[south, west], [north, east]])
+            for place in places_data:
+                folium.Marker(
+                    [place["latitude"], place["longitude"]],
+                    tooltip=place["name"],
+                    popup=f"{place['name']} — {place.get('region') or ''}",
+                ).add_to(heritage_map)
+            state = st_folium(heritage_map, height=520, use_container_width=True, returned_objects=["bounds"])
+            visible = (state or {}).get("bounds") or {}
+            if visible.get("_southWest") and visible.get("_northEast"):
+                new_bounds = _clamp_bounds((
+                    visible["_southWest"]["lat"], visible["_southWest"]["lng"],
+                    visible["_northEast"]["lat"], visible["_northEast"]["lng"],
+                ))
+                if [round(v, 3) for v in new_bounds] != [round(v, 3) for v in bounds]:
+                    st.session_state.map_bounds = new_bounds
+                    st.rerun()
+        else:
+            st.caption("Install `streamlit-folium` to pan and zoom; showing all of Telangana.")
+            if places_data:
+                st.map(pd.DataFrame([{"lat": p["latitude"], "lon": p["longitude"]} for p in places_data]))
+        st.caption(f"{len(places_data)} places in view")
+
+    # --- Page 3: Submit a Story ---
     elif page == "Submit a Story":
         st.header("Submit a Story to the Archive")
         st.info(f"You are contributing as: **{st.session_state.username}**")
@@ -165,16 +392,13 @@ def main_app():
                 if not ai_place_name or not ai_points:
                     st.warning("To generate a story, please enter the Place Name and at least one Key Point above.")
                 else:
-                    with st.spinner("AI is writing your story..."):
-                        try:
-                            points_list = [p.strip() for p in ai_points.split('\n') if p.strip()]
-                            response = requests.post(f"{API_URL}/ai/generate-story", json={"place_name": ai_place_name, "points": points_list})
-                            response.raise_for_status()
-                            generated_story = response.json().get("story", "")
-                            st.session_state.generated_story = generated_story
-                            st.success("AI story generated! It has been placed in the text area below.")
-                        except requests.exceptions.RequestException as e:
-                            st.error(f"Failed to generate story: {e.response.json().get('detail')}")
+                    try:
+                        points_list = [p.strip() for p in ai_points.split('\n') if p.strip()]
+                        generated_story = st.write_stream(stream_story(ai_place_name, points_list))
+                        st.session_state.generated_story = generated_story
+                        st.success("AI story generated! It has been placed in the text area below.")
+                    except (requests.exceptions.RequestException, RuntimeError) as e:
+                        st.error(f"Failed to generate story: {e}")
 
         st.markdown("---")
         st.subheader("Submission Form")
@@ -186,7 +410,8 @@ def main_app():
             era = st.text_input("Era / Year Built")
             story_text = st.text_area("Your Story or Memories*", height=200, value=st.session_state.get("generated_story", ""))
             architectural_tags = st.text_input("Architectural Tags (comma-separated)", placeholder="e.g., Courtyard, Wooden Beams")
-            image_url_input = st.text_input("Image URL (optional)", placeholder="https://example.com/image.jpg")
+            uploaded_photo = st.file_uploader("Upload a photo (optional)", type=["jpg", "jpeg", "png", "webp"])
+            image_url_input = st.text_input("...or an Image URL (optional)", placeholder="https://example.com/image.jpg")
             submitted = st.form_submit_button("Submit Story to Archive")
             if submitted:
                 if 'generated_story' in st.session_state:
@@ -194,23 +419,34 @@ def main_app():
                 if not place_name or not region or not story_text or not area:
                     st.error("Please fill in all required fields marked with an asterisk (*).")
                 else:
+                    if uploaded_photo is not None:
+                        try:
+                            image_url_input = upload_image(uploaded_photo)
+                        except requests.exceptions.RequestException as e:
+                            st.error(f"Could not upload the photo: {e}")
+                            st.stop()
                     place_data = {
                         "name": place_name, "type": place_type, "area": area, "region": region,
                         "era": era, "story": story_text, "tags": architectural_tags,
                         "image_url": image_url_input,
-                        "contributor_username": st.session_state.username # Use the logged-in user's name
-                    }
+                    } # The backend credits the signed-in user
                     try:
-                        response = requests.post(f"{API_URL}/places/", json=place_data)
+                        response = get_api().post("/places/", json=place_data, headers=auth_headers())
+                        if response.status_code == 401:
+                            st.error("Your session has expired. Please log in again.")
+                            st.session_state.logged_in = False
+                            st.stop()
                         response.raise_for_status() 
                         st.success(f"Thank you! Your story about {place_name} has been submitted.")
-                        st.cache_data.clear()
+                        load_page.clear()
+                        search_places.clear()
+                        load_facets.clear()
                         st.balloons()
                     except requests.exceptions.RequestException as e:
                         st.error(f"An error occurred while submitting: {e}")
                         if e.response: st.json(e.response.json())
     
-    # --- Page 3: About ---
+    # --- Page 4: About ---
     elif page == "About the Project":
         st.header("About This Initiative")
         st.markdown("""
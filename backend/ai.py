@@ -0,0 +1,170 @@
+# backend/ai.py
+import asyncio
+import contextvars
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import List
+
+from . import metrics
+from .cache import TTLCache
+
+MODEL_NAME = os.environ.get("GEMINI_MODEL", "gemini-1.5-flash")
+AI_MAX_CONCURRENCY = int(os.environ.get("AI_MAX_CONCURRENCY", "4"))
+AI_TIMEOUT_SECONDS = float(os.environ.get("AI_TIMEOUT_SECONDS", "30"))
+AI_CACHE_SIZE = int(os.environ.get("AI_CACHE_SIZE", "256"))
+AI_CACHE_TTL_SECONDS = float(os.environ.get("AI_CACHE_TTL_SECONDS", "3600"))
+
+_DONE = object()
+
+
+def build_prompt(place_name: str, points: List[str]) -> str:
+    key_points = "\n- ".join(points)
+    return f"""
+    You are a historical storyteller for a cultural heritage project called "గడులు & గృహాలు".
+    Your task is to weave the following key points about a place named "{place_name}" into a short, engaging, and respectful narrative story of about 2-3 paragraphs.
+
+    Key Points:
+    - {key_points}
+
+    Generated Story:
+    """
+
+
+def _normalize(value: str) -> str:
+    return " ".join(value.split()).casefold()
+
+
+def cache_key(place_name: str, points: List[str]):
+    return _normalize(place_name), tuple(_normalize(p) for p in points if p.strip())
+
+
+class StoryGeneratorBusy(Exception):
+    """No model slot came free within the timeout; the caller should answer 503."""
+
+
+class StoryGenerator:
+    """Runs the blocking Gemini client off the event loop.
+
+    At most `max_concurrency` calls are in flight, and waiting for one of those slots
+    counts against the same `timeout` as the call itself. Finished stories are cached
+    for `cache_ttl` seconds, and identical concurrent requests share one call.
+    Pass `model` (anything with `generate_content(prompt)`) to use a fake in tests.
+    """
+
+    def __init__(
+        self,
+        model=None,
+        max_concurrency: int = AI_MAX_CONCURRENCY,
+        timeout: float = AI_TIMEOUT_SECONDS,
+        cache_size: int = AI_CACHE_SIZE,
+        cache_ttl: float = AI_CACHE_TTL_SECONDS,
+    ):
+        self._model = model
+        self.timeout = timeout
+        self.cache = TTLCache(maxsize=cache_size, ttl=cache_ttl)
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="ai-story")
+        self._slots = asyncio.Semaphore(max_concurrency)
+        self._inflight = {}
+
+    @property
+    def model(self):
+        if self._model is None:
+            # Imported on first use: the SDK is slow to import and most requests never need it
+            import google.generativeai as genai
+            genai.configure(api_key=os.environ.get("GEMINI_API_KEY"))
+            self._model = genai.GenerativeModel(MODEL_NAME)
+        return self._model
+
+    @model.setter
+    def model(self, model):
+        self._model = model
+
+    async def generate(self, place_name: str, points: List[str]) -> str:
+        key = cache_key(place_name, points)
+        story = self.cache.get(key)
+        if story is not None:
+            return story
+
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._generate(key, build_prompt(place_name, points)))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        # A client disconnecting must not cancel the call other requests are waiting on
+        return await asyncio.shield(task)
+
+    async def _acquire_slot(self, timeout: float):
+        # A slot is only freed when its worker thread returns, and a hung model call may
+        # never return, so waiting for one has to be bounded too
+        try:
+            await asyncio.wait_for(self._slots.acquire(), timeout=timeout)
+        except asyncio.TimeoutError:
+            raise StoryGeneratorBusy() from None
+
+    async def _generate(self, key, prompt: str) -> str:
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.timeout
+        await self._acquire_slot(self.timeout)
+        # The worker thread runs in this request's context so its timing is attributed to it
+        call = loop.run_in_executor(self._executor, contextvars.copy_context().run, self._call_model, prompt)
+        # The slot is held until the worker thread really finishes, even after a timeout
+        call.add_done_callback(lambda _: self._slots.release())
+        story = await asyncio.wait_for(asyncio.shield(call), timeout=max(deadline - loop.time(), 0))
+        self.cache.set(key, story)
+        return story
+
+    def _call_model(self, prompt: str) -> str:
+        with metrics.timed("gemini", "generate"):
+            return self.model.generate_content(prompt).text
+
+    async def stream(self, place_name: str, points: List[str]):
+        """Yields the story in chunks as the model produces them."""
+        key = cache_key(place_name, points)
+        story = self.cache.get(key)
+        if story is None and key in self._inflight:
+            story = await asyncio.shield(self._inflight[key])
+        if story is not None:
+            yield story
+            return
+
+        loop = asyncio.get_running_loop()
+        chunks = asyncio.Queue()
+        stop = threading.Event()
+
+        def produce():
+            try:
+                with metrics.timed("gemini", "stream"):
+                    for chunk in self.model.generate_content(build_prompt(place_name, points), stream=True):
+                        if stop.is_set():
+                            return
+                        loop.call_soon_threadsafe(chunks.put_nowait, chunk.text)
+            except Exception as e:
+                loop.call_soon_threadsafe(chunks.put_nowait, e)
+            finally:
+                loop.call_soon_threadsafe(chunks.put_nowait, _DONE)
+
+        await self._acquire_slot(self.timeout)
+        call = loop.run_in_executor(self._executor, contextvars.copy_context().run, produce)
+        call.add_done_callback(lambda _: self._slots.release())
+        parts = []
+        try:
+            while True:
+                # The timeout applies between chunks, so long stories are not cut off
+                chunk = await asyncio.wait_for(chunks.get(), timeout=self.timeout)
+                if chunk is _DONE:
+                    break
+                if isinstance(chunk, Exception):
+                    raise chunk
+                parts.append(chunk)
+                yield chunk
+        finally:
+            stop.set()
+        self.cache.set(key, "".join(parts))
+
+
+story_generator = StoryGenerator()
+
+
+def get_story_generator() -> StoryGenerator:
+    return story_generator
@@ -0,0 +1,125 @@
+# backend/auth.py
+"""Signed access tokens issued by /login.
+
+Tokens are HS256 JWTs built with the standard library, so checking one is an HMAC
+and a JSON decode, with no database round trip and no bcrypt. Logging out records the
+token's id in a small in-memory revocation list until the token would have expired
+anyway.
+"""
+import base64
+import hashlib
+import hmac
+import json
+import logging
+import os
+import secrets
+import threading
+import time
+from typing import Dict, Optional
+
+from fastapi import Depends, HTTPException
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+from pydantic import BaseModel
+
+logger = logging.getLogger(__name__)
+
+TOKEN_TTL_SECONDS = int(os.environ.get("TOKEN_TTL_SECONDS", str(12 * 3600)))
+
+_HEADER = {"alg": "HS256", "typ": "JWT"}
+
+
+class InvalidToken(Exception):
+    pass
+
+
+class TokenUser(BaseModel):
+    id: int
+    username: str
+    token_id: str
+    expires_at: int
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+
+def _b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+
+class TokenSigner:
+    def __init__(self, secret: bytes, ttl: int = TOKEN_TTL_SECONDS, clock=time.time):
+        self._secret = secret
+        self.ttl = ttl
+        self._clock = clock
+        self._revoked: Dict[str, float] = {} # token id -> expiry
+        self._lock = threading.Lock()
+
+    def _sign(self, signing_input: bytes) -> bytes:
+        return hmac.new(self._secret, signing_input, hashlib.sha256).digest()
+
+    def issue(self, user_id: int, username: str) -> str:
+        now = int(self._clock())
+        claims = {"sub": username, "uid": user_id, "iat": now, "exp": now + self.ttl, "jti": secrets.token_urlsafe(12)}
+        signing_input = ".".join(
+            _b64encode(json.dumps(part, separators=(",", ":")).encode()) for part in (_HEADER, claims)
+        )
+        return f"{signing_input}.{_b64encode(self._sign(signing_input.encode('ascii')))}"
+
+    def verify(self, token: str) -> TokenUser:
+        try:
+            header, payload, signature = token.split(".")
+            expected = self._sign(f"{header}.{payload}".encode("ascii"))
+            if not hmac.compare_digest(expected, _b64decode(signature)):
+                raise InvalidToken("Bad signature")
+            if json.loads(_b64decode(header)) != _HEADER:
+                raise InvalidToken("Unsupported token header")
+            claims = json.loads(_b64decode(payload))
+            user = TokenUser(id=claims["uid"], username=claims["sub"], token_id=claims["jti"], expires_at=claims["exp"])
+        except InvalidToken:
+            raise
+        except (ValueError, KeyError, TypeError) as e:
+            raise InvalidToken("Malformed token") from e
+        if user.expires_at <= self._clock():
+            raise InvalidToken("Token expired")
+        if user.token_id in self._revoked:
+            raise InvalidToken("Token revoked")
+        return user
+
+    def revoke(self, user: TokenUser):
+        now = self._clock()
+        with self._lock:
+            # Expired tokens are rejected anyway, so the list only holds live ones
+            self._revoked = {jti: exp for jti, exp in self._revoked.items() if exp > now}
+            self._revoked[user.token_id] = user.expires_at
+
+
+def _secret_from_env() -> bytes:
+    secret = os.environ.get("AUTH_SECRET_KEY")
+    if secret:
+        return secret.encode("utf-8")
+    logger.warning("AUTH_SECRET_KEY is not set; tokens will not survive a restart or work across workers")
+    return secrets.token_bytes(32)
+
+
+token_signer = TokenSigner(_secret_from_env())
+
+
+def get_token_signer() -> TokenSigner:
+    return token_signer
+
+
+_bearer = HTTPBearer(auto_error=False)
+
+
+def get_current_user(
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(_bearer),
+    signer: TokenSigner = Depends(get_token_signer),
+) -> TokenUser:
+    """Dependency for endpoints that need a signed-in user. Answers 401 otherwise."""
+    if credentials is None:
+        raise HTTPException(status_code=401, detail="Not authenticated", headers={"WWW-Authenticate": "Bearer"})
+    try:
+        return signer.verify(credentials.credentials)
+    except InvalidToken as e:
+        raise HTTPException(status_code=401, detail=str(e), headers={"WWW-Authenticate": "Bearer"})
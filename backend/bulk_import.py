@@ -0,0 +1,211 @@
+# backend/bulk_import.py
+import argparse
+import csv
+import io
+import json
+import logging
+from collections import Counter
+from datetime import datetime
+from typing import Iterable, List, Optional, Tuple
+
+from pydantic import ValidationError
+from sqlalchemy import bindparam, insert, select, update
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from . import facets, models, schemas, versioning
+from .crud import badge_expression
+from .geohash import encode
+
+DEFAULT_BATCH_SIZE = 1000
+
+_PLACE_COLUMNS = [
+    "name", "type", "region", "area", "era", "story", "tags", "image_url",
+    "latitude", "longitude", "geohash", "contributor_id", "created_at", "updated_at",
+    "change_version",
+]
+
+
+def to_place_create(record: dict) -> schemas.PlaceCreate:
+    """Accepts both the API's PlaceCreate shape and the 1.py / stories.json shape."""
+    record = dict(record)
+    if "image_url" not in record and "image" in record:
+        record["image_url"] = record.pop("image")
+    if "contributor_username" not in record and "contributor_id" in record:
+        record["contributor_username"] = record.pop("contributor_id")
+    if isinstance(record.get("tags"), list):
+        record["tags"] = ", ".join(tag.strip() for tag in record["tags"] if tag and tag.strip())
+    return schemas.PlaceCreate.model_validate(record)
+
+
+class BulkImporter:
+    """Validates records and writes them in batches.
+
+    Each batch upserts its contributors in one pass, applies their contribution
+    counts in aggregate and inserts places with a single COPY (Postgres) or
+    executemany. A batch that fails is retried row by row with executemany, so a
+    record that fails is reported and skipped; the rest of its batch is still written.
+    """
+
+    def __init__(self, db: Session, batch_size: int = DEFAULT_BATCH_SIZE, contributor: Optional[str] = None):
+        self.db = db
+        self.batch_size = batch_size
+        # When set, every place is credited to this user instead of the one the record names
+        self.contributor = contributor
+        self._copy = db.get_bind().dialect.driver == "psycopg2"
+        # SQLAlchemyError includes DBAPIError; the raw COPY cursor raises psycopg2's own errors unwrapped
+        self._write_errors = (SQLAlchemyError,)
+        if self._copy:
+            import psycopg2
+            self._write_errors += (psycopg2.Error,)
+        self.inserted = 0
+        self.errors: List[schemas.BulkImportError] = []
+        self._batch: List[Tuple[str, schemas.PlaceCreate]] = []
+
+    def add(self, ref, record):
+        try:
+            if isinstance(record, Exception):
+                raise record
+            if not isinstance(record, dict):
+                raise ValueError("Expected a JSON object")
+            if self.contributor is not None:
+                record = {**record, "contributor_username": self.contributor}
+            self._batch.append((str(ref), to_place_create(record)))
+        except ValidationError as e:
+            message = "; ".join(f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors())
+            self.errors.append(schemas.BulkImportError(ref=str(ref), error=message))
+            return
+        except (ValueError, TypeError) as e:
+            self.errors.append(schemas.BulkImportError(ref=str(ref), error=str(e)))
+            return
+        if len(self._batch) >= self.batch_size:
+            self.flush()
+
+    def add_many(self, items: Iterable[Tuple[str, object]]):
+        for ref, record in items:
+            self.add(ref, record)
+
+    def flush(self):
+        batch, self._batch = self._batch, []
+        if not batch:
+            return
+        try:
+            self._write(batch, copy=self._copy)
+            self.inserted += len(batch)
+        except self._write_errors:
+            self.db.rollback()
+            # Retry one by one so a single bad row does not sink the whole batch
+            for ref, place in batch:
+                try:
+                    self._write([(ref, place)], copy=False)
+                    self.inserted += 1
+                except SQLAlchemyError as e:
+                    self.db.rollback()
+                    self.errors.append(schemas.BulkImportError(ref=ref, error=str(getattr(e, "orig", None) or e)))
+
+    def finish(self) -> schemas.BulkImportReport:
+        self.flush()
+        return schemas.BulkImportReport(inserted=self.inserted, failed=len(self.errors), errors=self.errors)
+
+    def _write(self, batch, copy: bool):
+        db = self.db
+        counts = Counter(place.contributor_username for _, place in batch)
+        user_ids = self._upsert_contributors(counts)
+
+        version = versioning.bump(db)
+        now = datetime.utcnow()
+        rows = []
+        for _, place in batch:
+            row = {key: (None if value == "" else value) for key, value in place.model_dump(exclude={"contributor_username"}).items()}
+            row.update(contributor_id=user_ids[place.contributor_username], created_at=now, updated_at=now, change_version=version)
+            # Set explicitly because COPY bypasses the column default
+            row["geohash"] = None if place.latitude is None or place.longitude is None else encode(place.latitude, place.longitude)
+            rows.append(row)
+
+        if copy:
+            self._copy_places(rows)
+        else:
+            db.execute(insert(models.Place.__table__), rows)
+        facets.increment(db, facets.count_values(rows))
+        db.commit()
+
+    def _upsert_contributors(self, counts: Counter) -> dict:
+        db = self.db
+        users = models.User.__table__
+        usernames = list(counts)
+        existing = dict(db.execute(select(users.c.username, users.c.id).where(users.c.username.in_(usernames))).all())
+        missing = [name for name in usernames if name not in existing]
+        if missing:
+            db.execute(insert(users), [{"username": name, "contributions": 0} for name in missing])
+            existing.update(db.execute(select(users.c.username, users.c.id).where(users.c.username.in_(missing))).all())
+        db.execute(
+            update(users)
+            .where(users.c.id == bindparam("user_id"))
+            .values(
+                contributions=users.c.contributions + bindparam("added"),
+                badge=badge_expression(users.c.contributions + bindparam("added"), users.c.badge),
+            ),
+            [{"user_id": existing[name], "added": count} for name, count in counts.items()],
+        )
+        return existing
+
+    def _copy_places(self, rows):
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for row in rows:
+            # Unquoted empty fields are NULL in COPY ... CSV
+            writer.writerow(["" if row[column] is None else row[column] for column in _PLACE_COLUMNS])
+        buffer.seek(0)
+        cursor = self.db.connection().connection.cursor()
+        cursor.copy_expert(f"COPY places ({', '.join(_PLACE_COLUMNS)}) FROM STDIN WITH (FORMAT csv)", buffer)
+
+
+def iter_ndjson(lines: Iterable[str], start: int = 1):
+    """Yields (line_number, record). Records that are not valid JSON come back as a ValueError."""
+    for number, line in enumerate(lines, start=start):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield number, json.loads(line)
+        except ValueError as e:
+            yield number, ValueError(f"Invalid JSON: {e}")
+
+
+def iter_json_file(path: str):
+    """Reads a stories.json-style file: an object keyed by slug, or a plain list."""
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    return data.items() if isinstance(data, dict) else enumerate(data, start=1)
+
+
+def import_file(db: Session, path: str, batch_size: int = DEFAULT_BATCH_SIZE) -> schemas.BulkImportReport:
+    importer = BulkImporter(db, batch_size)
+    if path.endswith(".json"):
+        importer.add_many(iter_json_file(path))
+    else:
+        with open(path, encoding="utf-8") as f:
+            importer.add_many(iter_ndjson(f))
+    return importer.finish()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bulk-load places from stories.json or NDJSON")
+    parser.add_argument("path", help="A .json file keyed by slug (1.py format) or an NDJSON file, one place per line")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    args = parser.parse_args()
+
+    from dotenv import load_dotenv
+    load_dotenv()
+    logging.basicConfig(level=logging.INFO)
+
+    from .database import SessionLocal
+    from .translation import backfill
+
+    with SessionLocal() as session:
+        report = import_file(session, args.path, args.batch_size)
+        print(f"Inserted {report.inserted} places, {report.failed} failed")
+        for error in report.errors:
+            print(f"  {error.ref}: {error.error}")
+        if report.inserted:
+            print(f"Translated {backfill(session)} places")
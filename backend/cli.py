@@ -0,0 +1,38 @@
+# backend/cli.py
+"""The shared skeleton of the `python -m backend.<module> <command>` maintenance scripts."""
+import argparse
+import logging
+from typing import Callable, Dict
+
+
+def arg(*flags, **options):
+    """One add_argument() call for a Command."""
+    return flags, options
+
+
+class Command:
+    """A subcommand: `run(session, args)` does the work and returns the line to print."""
+
+    def __init__(self, help: str, run: Callable, *arguments):
+        self.help = help
+        self.run = run
+        self.arguments = arguments
+
+
+def main(description: str, commands: Dict[str, Command]):
+    parser = argparse.ArgumentParser(description=description)
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    for name, command in commands.items():
+        subparser = subcommands.add_parser(name, help=command.help)
+        for flags, options in command.arguments:
+            subparser.add_argument(*flags, **options)
+    args = parser.parse_args()
+
+    # Engines are built on first use, so backend/.env still applies here
+    from dotenv import load_dotenv
+    load_dotenv()
+    logging.basicConfig(level=logging.INFO)
+    from .database import SessionLocal
+
+    with SessionLocal() as session:
+        print(commands[args.command].run(session, args))
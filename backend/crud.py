@@ -0,0 +1,68 @@
+# backend/crud.py
+from sqlalchemy import case, insert
+from sqlalchemy.orm import Session
+
+from . import facets, models, schemas, versioning
+from .upsert import dialect_insert
+
+# Earned automatically, highest threshold first. Any other badge (e.g. "Curator 🏛️")
+# was given by hand and is never overwritten.
+CONTRIBUTION_BADGES = [
+    (10, "Heritage Keeper 🏅"),
+    (3, "Storyteller 📖"),
+    (0, "New Contributor ✨"),
+]
+_AUTOMATIC_BADGES = [badge for _, badge in CONTRIBUTION_BADGES]
+
+
+def badge_for(contributions: int) -> str:
+    for threshold, badge in CONTRIBUTION_BADGES:
+        if contributions >= threshold:
+            return badge
+    return CONTRIBUTION_BADGES[-1][1]
+
+
+def badge_expression(contributions, current_badge):
+    """SQL version of badge_for() that keeps hand-assigned badges."""
+    return case(
+        (current_badge.is_not(None) & current_badge.not_in(_AUTOMATIC_BADGES), current_badge),
+        *[(contributions >= threshold, badge) for threshold, badge in CONTRIBUTION_BADGES],
+        else_=CONTRIBUTION_BADGES[-1][1],
+    )
+
+
+def create_place(db: Session, place: schemas.PlaceCreate) -> schemas.Place:
+    """Stores a place and credits its contributor.
+
+    The contributor row is created or incremented with a single
+    INSERT ... ON CONFLICT DO UPDATE, so concurrent submissions never lose a count,
+    and the place comes back from INSERT ... RETURNING without a refresh.
+    """
+    users = models.User.__table__
+    places = models.Place.__table__
+
+    contributions = users.c.contributions + 1
+    upsert = (
+        dialect_insert(db, users)
+        .values(username=place.contributor_username, contributions=1, badge=badge_for(1))
+        .on_conflict_do_update(
+            index_elements=[users.c.username],
+            set_={"contributions": contributions, "badge": badge_expression(contributions, users.c.badge)},
+        )
+        .returning(users.c.id, users.c.username, users.c.badge, users.c.contributions)
+    )
+    contributor = db.execute(upsert).mappings().one()
+
+    place_dict = place.model_dump(exclude={"contributor_username"})
+    # Convert empty strings to None before saving
+    for key, value in place_dict.items():
+        if value == "":
+            place_dict[key] = None
+
+    version = versioning.bump(db)
+    row = db.execute(
+        insert(places).values(**place_dict, contributor_id=contributor["id"], change_version=version).returning(*places.c)
+    ).mappings().one()
+    facets.increment(db, facets.count_values([row]))
+    db.commit()
+    return schemas.Place.model_validate({**row, "contributor": dict(contributor)})
@@ -1,13 +1,100 @@
 # backend/database.py
+"""Engines and session factories, built from the environment on first use.
+
+Nothing is read or connected at import time, so entry points can call
+load_dotenv() (or set DATABASE_URL) after importing backend modules and still
+get the database they asked for.
+"""
+import os
+import threading
 
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
-DATABASE_URL = "postgresql://apple@localhost/apple"
+DEFAULT_DATABASE_URL = "postgresql://apple@localhost/apple"
+
+_ASYNC_DRIVERS = {"postgresql": "asyncpg", "sqlite": "aiosqlite"}
+
+
+def database_url() -> str:
+    return os.environ.get("DATABASE_URL", DEFAULT_DATABASE_URL)
+
+
+def async_database_url() -> str:
+    return os.environ.get("ASYNC_DATABASE_URL") or async_url(database_url())
+
+
+def engine_options(url: str) -> dict:
+    """Pool settings from the DB_POOL_* variables. SQLite (used for tests and local runs) keeps SQLAlchemy's defaults."""
+    if make_url(url).get_backend_name() == "sqlite":
+        return {"connect_args": {"check_same_thread": False}}
+    return {
+        "pool_size": int(os.environ.get("DB_POOL_SIZE", "5")),
+        "max_overflow": int(os.environ.get("DB_MAX_OVERFLOW", "10")),
+        "pool_timeout": float(os.environ.get("DB_POOL_TIMEOUT", "30")),
+        "pool_recycle": int(os.environ.get("DB_POOL_RECYCLE", "1800")),
+        "pool_pre_ping": os.environ.get("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes"),
+    }
+
+
+def async_url(url: str) -> str:
+    """The same database through its asyncio driver (asyncpg for Postgres, aiosqlite for SQLite)."""
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if backend not in _ASYNC_DRIVERS:
+        raise ValueError(f"No async driver configured for {backend}; set ASYNC_DATABASE_URL")
+    return parsed.set(drivername=f"{backend}+{_ASYNC_DRIVERS[backend]}").render_as_string(hide_password=False)
+
+
+_lock = threading.Lock()
+engine = None
+async_engine = None
+
+
+def get_engine():
+    global engine
+    if engine is None:
+        with _lock:
+            if engine is None:
+                url = database_url()
+                engine = create_engine(url, **engine_options(url))
+                SessionLocal.configure(bind=engine)
+    return engine
+
+
+# Read endpoints run as coroutines on this engine. Scripts that only write never
+# create it, so they do not need the async driver installed.
+def get_async_engine():
+    global async_engine
+    if async_engine is None:
+        with _lock:
+            if async_engine is None:
+                url = async_database_url()
+                options = engine_options(url)
+                options.pop("connect_args", None) # aiosqlite runs every connection on its own thread
+                async_engine = create_async_engine(url, **options)
+                AsyncSessionLocal.configure(bind=async_engine)
+    return async_engine
+
+
+class _LazySessionmaker(sessionmaker):
+    """Builds the engine the first time a session is opened."""
+
+    def __call__(self, **local_kw):
+        get_engine()
+        return super().__call__(**local_kw)
+
+
+class _LazyAsyncSessionmaker(async_sessionmaker):
+    def __call__(self, **local_kw):
+        get_async_engine()
+        return super().__call__(**local_kw)
 
-engine = create_engine(DATABASE_URL)
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+SessionLocal = _LazySessionmaker(autocommit=False, autoflush=False)
+AsyncSessionLocal = _LazyAsyncSessionmaker(autoflush=False, expire_on_commit=False)
 
 Base = declarative_base()
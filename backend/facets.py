@@ -0,0 +1,119 @@
+# backend/facets.py
+from collections import Counter
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import bindparam, delete, func, or_, select, update
+from sqlalchemy.orm import Session
+
+from . import models
+from .upsert import dialect_insert
+
+FACETS = ("region", "type", "era", "tag")
+
+
+def split_tags(tags) -> List[str]:
+    return [tag.strip() for tag in (tags or "").split(",") if tag.strip()]
+
+
+def normalize_tags(tags) -> Optional[str]:
+    """The stored form of a tag list: the split_tags() items joined by ", ", or None if there are none."""
+    return ", ".join(split_tags(tags)) or None
+
+
+def has_tag(column, tag: str):
+    """SQL condition: `tag` is one whole item of a normalized tag list. LIKE wildcards in it match literally."""
+    return ("," + func.replace(column, ", ", ",") + ",").contains(f",{tag},", autoescape=True)
+
+
+def count_values(places: Iterable) -> Counter:
+    """Counts (facet, value) pairs over place rows or dicts."""
+    counts = Counter()
+    for place in places:
+        get = place.get if hasattr(place, "get") else lambda key: getattr(place, key, None)
+        for facet in ("region", "type", "era"):
+            if get(facet):
+                counts[(facet, get(facet))] += 1
+        for tag in set(split_tags(get("tags"))):
+            counts[("tag", tag)] += 1
+    return counts
+
+
+def increment(db: Session, counts: Counter):
+    """Adds `counts` to the facet table in one executemany, as part of the caller's transaction."""
+    if not counts:
+        return
+    table = models.PlaceFacet.__table__
+    stmt = dialect_insert(db, table)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.facet, table.c.value],
+        set_={"count": table.c.count + stmt.excluded.count},
+    )
+    # A stable order keeps concurrent writers from deadlocking on each other's rows
+    db.execute(stmt, [
+        {"facet": facet, "value": value, "count": count}
+        for (facet, value), count in sorted(counts.items())
+    ])
+
+
+def read_facets(db: Session) -> Dict[str, List[dict]]:
+    result = {facet: [] for facet in FACETS}
+    rows = db.execute(
+        select(models.PlaceFacet.facet, models.PlaceFacet.value, models.PlaceFacet.count)
+        .where(models.PlaceFacet.count > 0)
+        .order_by(models.PlaceFacet.facet, models.PlaceFacet.count.desc(), models.PlaceFacet.value)
+    )
+    for facet, value, count in rows:
+        result.setdefault(facet, []).append({"value": value, "count": count})
+    return result
+
+
+def normalize_stored_tags(db: Session, batch_size: int = 1000) -> int:
+    """Rewrites tags stored before writes normalized them. Returns how many places changed."""
+    tags = models.Place.tags
+    # Only rows that cannot be in normalized form are read back
+    untidy = or_(
+        tags == "", tags.startswith(" "), tags.endswith(" "), tags.startswith(","), tags.endswith(","),
+        tags.contains(" ,"), tags.contains(",  "), func.replace(tags, ", ", "").contains(","),
+        *[tags.contains(space) for space in "\t\r\n"],
+    )
+    updates = [
+        {"row_id": place_id, "normalized": normalize_tags(value)}
+        for place_id, value in db.execute(select(models.Place.id, tags).where(untidy))
+        if normalize_tags(value) != value
+    ]
+    places = models.Place.__table__
+    for start in range(0, len(updates), batch_size):
+        # Same tags, so facet counts stay as they are; not an edit, so updated_at does too
+        db.execute(
+            update(places).where(places.c.id == bindparam("row_id"))
+            .values(tags=bindparam("normalized"), updated_at=places.c.updated_at),
+            updates[start:start + batch_size],
+        )
+    db.commit()
+    return len(updates)
+
+
+def rebuild(db: Session, batch_size: int = 5000) -> int:
+    """Recomputes every count from the places table. Returns the number of facet values."""
+    db.execute(delete(models.PlaceFacet))
+    counts = Counter()
+    rows = db.execute(
+        select(models.Place.region, models.Place.type, models.Place.era, models.Place.tags)
+        .execution_options(yield_per=batch_size)
+    ).mappings()
+    for partition in rows.partitions():
+        counts.update(count_values(partition))
+    increment(db, counts)
+    db.commit()
+    return len(counts)
+
+
+if __name__ == "__main__":
+    from . import cli
+
+    cli.main("Facet count maintenance", {
+        "rebuild": cli.Command(
+            "Recompute facet counts from the places table",
+            lambda session, args: f"Rebuilt {rebuild(session)} facet values",
+        ),
+    })
@@ -0,0 +1,224 @@
+# backend/geo.py
+"""Spatial lookups on Place.latitude / Place.longitude.
+
+Every place with coordinates carries a geohash, and a B-tree index on it turns a
+bounding box into a handful of prefix range scans. On Postgres with PostGIS a GiST
+index on the point is used instead. Either way the database only returns
+candidates inside the box; distances are computed afterwards in one vectorized pass.
+"""
+import math
+from functools import lru_cache
+from typing import List, Optional, Tuple
+
+from sqlalchemy import and_, bindparam, func, literal_column, or_, select, text, update
+from sqlalchemy.orm import Session, joinedload
+
+from . import models
+from .geohash import BASE32, GEOHASH_PRECISION, encode
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = 111.32
+# A bounding box is covered by at most this many geohash prefixes (index range scans)
+MAX_CELLS = 24
+
+# Same expression for the index and the queries, so the planner can use it
+_PG_POINT = "ST_SetSRID(ST_MakePoint(longitude, latitude), 4326)"
+_POSTGIS_DDL = [
+    f"CREATE INDEX IF NOT EXISTS ix_places_point ON places USING gist (({_PG_POINT})) WHERE latitude IS NOT NULL",
+]
+_postgis_databases = {} # database -> whether PostGIS is installed there
+
+BBox = Tuple[float, float, float, float] # (south, west, north, east)
+
+
+def _cell_size(precision: int) -> Tuple[float, float]:
+    bits = 5 * precision
+    return 180.0 / 2 ** (bits // 2), 360.0 / 2 ** ((bits + 1) // 2)
+
+
+def covering_cells(bbox: BBox, max_cells: int = MAX_CELLS) -> List[str]:
+    """The geohash prefixes, as long as possible, whose cells together cover `bbox`."""
+    south, west, north, east = bbox
+    for precision in range(GEOHASH_PRECISION, 0, -1):
+        height, width = _cell_size(precision)
+        rows = math.floor((north + 90) / height) - math.floor((south + 90) / height) + 1
+        columns = math.floor((east + 180) / width) - math.floor((west + 180) / width) + 1
+        if rows * columns <= max_cells:
+            break
+    cells = set()
+    latitude = south
+    while True:
+        longitude = west
+        while True:
+            cells.add(encode(min(latitude, 89.999999), min(longitude, 179.999999), precision))
+            if longitude >= east:
+                break
+            longitude = min(longitude + width, east)
+        if latitude >= north:
+            break
+        latitude = min(latitude + height, north)
+    return sorted(cells)
+
+
+def _prefix_end(prefix: str) -> Optional[str]:
+    """The smallest geohash greater than every hash starting with `prefix`."""
+    prefix = prefix.rstrip(BASE32[-1])
+    if not prefix:
+        return None
+    return prefix[:-1] + BASE32[BASE32.index(prefix[-1]) + 1]
+
+
+def bbox_around(latitude: float, longitude: float, radius_km: float) -> BBox:
+    dlat = radius_km / KM_PER_DEGREE
+    dlon = radius_km / (KM_PER_DEGREE * max(math.cos(math.radians(latitude)), 1e-6))
+    return (max(latitude - dlat, -90.0), max(longitude - dlon, -180.0),
+            min(latitude + dlat, 90.0), min(longitude + dlon, 180.0))
+
+
+def parse_bbox(value: str) -> BBox:
+    """Parses "south,west,north,east" in degrees."""
+    try:
+        south, west, north, east = (float(part) for part in value.split(","))
+    except ValueError:
+        raise ValueError("bbox must be south,west,north,east")
+    if not (-90 <= south <= north <= 90 and -180 <= west <= east <= 180):
+        raise ValueError("bbox must be south,west,north,east with south <= north and west <= east")
+    return south, west, north, east
+
+
+@lru_cache(maxsize=None)
+def numpy():
+    """numpy when installed (vectorized haversine), else None. Imported on first use."""
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
+
+def haversine_km(latitude: float, longitude: float, latitudes, longitudes):
+    """Distances from one point to many, as a list."""
+    np = numpy()
+    if np is not None:
+        lat1, lon1 = np.radians(latitude), np.radians(longitude)
+        lat2, lon2 = np.radians(np.asarray(latitudes, dtype=float)), np.radians(np.asarray(longitudes, dtype=float))
+        a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+        return (2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))).tolist()
+    lat1, lon1 = math.radians(latitude), math.radians(longitude)
+    cos_lat1 = math.cos(lat1)
+    distances = []
+    for lat2, lon2 in zip(latitudes, longitudes):
+        lat2, lon2 = math.radians(lat2), math.radians(lon2)
+        a = math.sin((lat2 - lat1) / 2) ** 2 + cos_lat1 * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+        distances.append(2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a)))
+    return distances
+
+
+def _has_postgis(conn) -> bool:
+    return conn.execute(text("SELECT 1 FROM pg_extension WHERE extname = 'postgis'")).first() is not None
+
+
+def create_spatial_index(bind):
+    """Adds the GiST index when PostGIS is installed. Safe to run repeatedly."""
+    with bind.begin() as conn:
+        if conn.dialect.name == "postgresql" and _has_postgis(conn):
+            for stmt in _POSTGIS_DDL:
+                conn.execute(text(stmt))
+
+
+def _database_key(url):
+    # The sync and async engines reach the same database through different drivers
+    return url.get_backend_name(), url.host, url.port, url.database
+
+
+def _uses_postgis(db: Session) -> bool:
+    url = db.get_bind().url
+    if url.get_backend_name() != "postgresql":
+        return False
+    key = _database_key(url)
+    if key not in _postgis_databases:
+        _postgis_databases[key] = _has_postgis(db)
+    return _postgis_databases[key]
+
+
+def bbox_clause(db: Session, bbox: BBox):
+    south, west, north, east = bbox
+    Place = models.Place
+    exact = and_(Place.latitude.between(south, north), Place.longitude.between(west, east))
+    if _uses_postgis(db):
+        envelope = func.ST_MakeEnvelope(west, south, east, north, 4326)
+        return and_(literal_column(_PG_POINT).op("&&")(envelope), exact)
+    ranges = []
+    for cell in covering_cells(bbox):
+        end = _prefix_end(cell)
+        ranges.append(Place.geohash >= cell if end is None else and_(Place.geohash >= cell, Place.geohash < end))
+    return and_(or_(*ranges), exact)
+
+
+def places_within(db: Session, bbox: BBox, limit: int = 500, options=()) -> List[models.Place]:
+    return db.scalars(
+        select(models.Place)
+        .options(joinedload(models.Place.contributor), *options)
+        .where(bbox_clause(db, bbox))
+        .order_by(models.Place.id)
+        .limit(limit)
+    ).all()
+
+
+def places_nearby(db: Session, latitude: float, longitude: float, radius_km: float,
+                  limit: int = 20, options=()) -> List[Tuple[models.Place, float]]:
+    """Returns [(Place, distance_km)] within `radius_km`, nearest first."""
+    Place = models.Place
+    candidates = db.execute(
+        select(Place.id, Place.latitude, Place.longitude)
+        .where(bbox_clause(db, bbox_around(latitude, longitude, radius_km)))
+    ).all()
+    if not candidates:
+        return []
+    ids, latitudes, longitudes = zip(*candidates)
+    distances = haversine_km(latitude, longitude, latitudes, longitudes)
+    nearest = sorted((d, place_id) for d, place_id in zip(distances, ids) if d <= radius_km)[:limit]
+    if not nearest:
+        return []
+    places = db.scalars(
+        select(Place)
+        .options(joinedload(Place.contributor), *options)
+        .where(Place.id.in_([place_id for _, place_id in nearest]))
+    ).all()
+    by_id = {place.id: place for place in places}
+    return [(by_id[place_id], distance) for distance, place_id in nearest if place_id in by_id]
+
+
+def reindex(db: Session, batch_size: int = 1000) -> int:
+    """Fills in geohashes for rows that have coordinates but no hash yet. Returns the number updated."""
+    Place = models.Place
+    updated = 0
+    while True:
+        rows = db.execute(
+            select(Place.id, Place.latitude, Place.longitude)
+            .where(Place.geohash.is_(None), Place.latitude.is_not(None), Place.longitude.is_not(None))
+            .limit(batch_size)
+        ).all()
+        if not rows:
+            break
+        places = Place.__table__
+        # A derived index value, not an edit: keep updated_at as it was
+        db.execute(
+            update(places).where(places.c.id == bindparam("row_id"))
+            .values(geohash=bindparam("hash"), updated_at=places.c.updated_at),
+            [{"row_id": row.id, "hash": encode(row.latitude, row.longitude)} for row in rows],
+        )
+        updated += len(rows)
+        db.commit()
+    return updated
+
+
+if __name__ == "__main__":
+    from . import cli
+
+    cli.main("Spatial index maintenance", {
+        "reindex": cli.Command(
+            "Compute geohashes for places that are missing one",
+            lambda session, args: f"Indexed {reindex(session)} places",
+        ),
+    })
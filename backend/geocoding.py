@@ -0,0 +1,351 @@
+# backend/geocoding.py
+import json
+import logging
+import os
+import random
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+
+from . import metrics, models, versioning
+from .database import SessionLocal
+from .geohash import encode
+from .leases import Lease, LeaseLost
+from .upsert import dialect_insert
+
+logger = logging.getLogger(__name__)
+
+Coordinates = Tuple[float, float]
+
+DEFAULT_BATCH_SIZE = 200
+MAX_ATTEMPTS = 4
+
+
+class GoogleGeocoder:
+    rate_per_second = 40.0
+
+    def __init__(self, api_key: str = None):
+        import googlemaps
+        self._client = googlemaps.Client(key=api_key or os.environ.get("GOOGLE_MAPS_API_KEY"))
+
+    def geocode(self, query: str) -> Optional[Coordinates]:
+        results = self._client.geocode(query, region="in")
+        if not results:
+            return None
+        location = results[0]["geometry"]["location"]
+        return location["lat"], location["lng"]
+
+
+class NominatimGeocoder:
+    # https://operations.osmfoundation.org/policies/nominatim/ allows one request per second
+    rate_per_second = 1.0
+
+    def __init__(self, user_agent: str = "gadulu-gruhalu-heritage-archive"):
+        from geopy.geocoders import Nominatim
+        self._client = Nominatim(user_agent=user_agent, timeout=10)
+
+    def geocode(self, query: str) -> Optional[Coordinates]:
+        location = self._client.geocode(query, country_codes="in")
+        return (location.latitude, location.longitude) if location else None
+
+
+class GazetteerGeocoder:
+    """Looks places up in a curated {"area, region": [lat, lon]} list instead of an online service.
+
+    For archives whose villages and neighbourhoods the public geocoders place poorly or
+    not at all: a local survey's coordinates are used as given, with no rate limit and no
+    network access. Lookups are case-insensitive; places not in the list stay unlocated.
+    """
+
+    rate_per_second = None
+
+    def __init__(self, entries: Dict[str, Coordinates] = None):
+        self.entries = {key.lower(): tuple(value) for key, value in (entries or {}).items()}
+
+    @classmethod
+    def from_file(cls, path: str):
+        with open(path, encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    def geocode(self, query: str) -> Optional[Coordinates]:
+        return self.entries.get(query.lower())
+
+
+_geocoder = None
+
+
+def get_geocoder():
+    """Builds the provider named by GEOCODING_PROVIDER (nominatim, google, gazetteer or none) on first use."""
+    global _geocoder
+    if _geocoder is None:
+        provider = os.environ.get("GEOCODING_PROVIDER", "nominatim")
+        if provider == "nominatim":
+            _geocoder = NominatimGeocoder()
+        elif provider == "google":
+            _geocoder = GoogleGeocoder()
+        elif provider == "gazetteer":
+            path = os.environ.get("GEOCODING_GAZETTEER")
+            _geocoder = GazetteerGeocoder.from_file(path) if path else GazetteerGeocoder()
+        elif provider == "none":
+            return None
+        else:
+            raise ValueError(f"Unknown GEOCODING_PROVIDER: {provider}")
+    return _geocoder
+
+
+def set_geocoder(geocoder):
+    global _geocoder
+    _geocoder = geocoder
+
+
+class TokenBucket:
+    """Allows `rate` acquisitions per second on average, in bursts of up to `capacity`."""
+
+    def __init__(self, rate: Optional[float], capacity: float = 1, clock=time.monotonic, sleep=time.sleep):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._clock = clock
+        self._sleep = sleep
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        if not self.rate:
+            return
+        with self._lock:
+            while True:
+                now = self._clock()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                self._sleep((1 - self._tokens) / self.rate)
+
+    def drain(self):
+        """Starts over with no tokens, e.g. when taking over from a process whose last call was just now."""
+        with self._lock:
+            self._tokens = 0
+            self._updated = self._clock()
+
+
+def cache_key(area: Optional[str], region: Optional[str]) -> str:
+    return "|".join((part or "").strip().lower() for part in (area, region))
+
+
+def query_for(area: Optional[str], region: Optional[str]) -> str:
+    return ", ".join(part.strip() for part in (area, region) if part and part.strip())
+
+
+def lookup(geocoder, bucket: TokenBucket, query: str, attempts: int = MAX_ATTEMPTS, sleep=time.sleep) -> Optional[Coordinates]:
+    """Calls the provider within the rate limit, retrying errors with exponential backoff and jitter."""
+    for attempt in range(attempts):
+        bucket.acquire()
+        try:
+            with metrics.timed("geocoding", "geocode"):
+                return geocoder.geocode(query)
+        except Exception:
+            if attempt == attempts - 1:
+                raise
+            delay = min(2 ** attempt, 30) * (0.5 + random.random())
+            logger.warning("Geocoding %r failed, retrying in %.1fs", query, delay)
+            sleep(delay)
+
+
+def geocode_missing(db: Session, geocoder, bucket: TokenBucket, batch_size: int = DEFAULT_BATCH_SIZE,
+                    keep_alive=None) -> int:
+    """Fills in coordinates for places that have none. Returns the number of places updated.
+
+    Places are grouped by (area, region), so each distinct location costs at most one
+    provider call ever: results, including "not found", are kept in geocode_cache.
+    `keep_alive`, if given, is called before every provider call (e.g. Lease.renew).
+    """
+    Place, Cache = models.Place, models.GeocodeCache
+    updated, last_id = 0, 0
+    while True:
+        rows = db.execute(
+            select(Place.id, Place.area, Place.region)
+            .where(Place.latitude.is_(None), Place.id > last_id)
+            .order_by(Place.id)
+            .limit(batch_size)
+        ).all()
+        if not rows:
+            return updated
+        last_id = rows[-1].id
+
+        by_key = defaultdict(list)
+        queries = {}
+        for row in rows:
+            query = query_for(row.area, row.region)
+            if query:
+                key = cache_key(row.area, row.region)
+                by_key[key].append(row.id)
+                queries[key] = query
+        known = {
+            entry.key: (entry.latitude, entry.longitude)
+            for entry in db.scalars(select(Cache).where(Cache.key.in_(list(by_key))))
+        }
+        # Provider calls can take seconds each; don't hold a transaction open across them
+        db.rollback()
+
+        found = {}
+        for key in by_key:
+            if key in known:
+                continue
+            if keep_alive is not None:
+                keep_alive()
+            try:
+                found[key] = lookup(geocoder, bucket, queries[key]) or (None, None)
+            except Exception:
+                logger.exception("Geocoding %r failed", queries[key])
+                # Not cached, so the next pass tries again
+        if found:
+            cache = Cache.__table__
+            # Another worker may have stored the same location meanwhile; either answer will do
+            db.execute(
+                dialect_insert(db, cache).on_conflict_do_nothing(index_elements=[cache.c.key]),
+                [
+                    {"key": key, "latitude": latitude, "longitude": longitude, "created_at": datetime.utcnow()}
+                    for key, (latitude, longitude) in found.items()
+                ],
+            )
+            known.update(found)
+
+        located = {key: place_ids for key, place_ids in by_key.items() if known.get(key, (None, None))[0] is not None}
+        batch_updated = 0
+        if located:
+            version = versioning.bump(db)
+        for key, place_ids in located.items():
+            latitude, longitude = known[key]
+            db.execute(
+                update(Place)
+                .where(Place.id.in_(place_ids), Place.latitude.is_(None))
+                .values(
+                    latitude=latitude,
+                    longitude=longitude,
+                    geohash=encode(latitude, longitude),
+                    updated_at=datetime.utcnow(),
+                    change_version=version,
+                )
+            )
+            batch_updated += len(place_ids)
+        db.commit()
+        updated += batch_updated
+
+
+class GeocodingWorker:
+    """Background thread that geocodes new places without slowing submissions down.
+
+    notify() wakes it right after a write; otherwise it rescans every `poll_seconds`.
+    Each API worker process runs one, but a pass only starts while holding the
+    "geocoding" lease, so across processes and hosts there is one pass at a time
+    and the provider's rate limit holds. A pass picks up rows written by any process.
+    """
+
+    def __init__(self, geocoder, poll_seconds: float = None, rate_per_second: float = None,
+                 session_factory=SessionLocal):
+        self.geocoder = geocoder
+        self.poll_seconds = poll_seconds or float(os.environ.get("GEOCODING_POLL_SECONDS", "300"))
+        rate = rate_per_second or float(os.environ.get("GEOCODING_RATE_PER_SECOND", "0")) or geocoder.rate_per_second
+        self.bucket = TokenBucket(rate)
+        self.session_factory = session_factory
+        self.lease = Lease("geocoding", float(os.environ.get("GEOCODING_LEASE_SECONDS", "60")), session_factory)
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="geocoding-worker", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def notify(self):
+        self._wake.set()
+
+    def run_once(self) -> int:
+        """One pass over places without coordinates, or 0 if another process is running one."""
+        if not self.lease.acquire():
+            return 0
+        # The previous holder may have called the provider a moment ago
+        self.bucket.drain()
+        try:
+            with self.session_factory() as db:
+                return geocode_missing(db, self.geocoder, self.bucket, keep_alive=self.lease.renew)
+        finally:
+            self.lease.release()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.clear()
+            try:
+                count = self.run_once()
+                if count:
+                    logger.info("Geocoded %s places", count)
+            except LeaseLost:
+                logger.warning("Geocoding lease expired during a pass; another process continues it")
+            except Exception:
+                logger.exception("Geocoding pass failed")
+            self._wake.wait(self.poll_seconds)
+
+
+_worker = None
+
+
+def start_worker() -> Optional[GeocodingWorker]:
+    """Starts the shared worker unless GEOCODING_PROVIDER is none."""
+    global _worker
+    geocoder = get_geocoder()
+    if geocoder is None:
+        return None
+    _worker = GeocodingWorker(geocoder)
+    _worker.start()
+    return _worker
+
+
+def stop_worker():
+    global _worker
+    if _worker is not None:
+        _worker.stop()
+        _worker = None
+
+
+def notify_worker():
+    if _worker is not None:
+        _worker.notify()
+
+
+def _geocode_all(session: Session, args) -> str:
+    geocoder = get_geocoder()
+    if geocoder is None:
+        raise SystemExit("GEOCODING_PROVIDER is none")
+    worker = GeocodingWorker(geocoder)
+    if not worker.lease.acquire():
+        raise SystemExit("Another process is geocoding right now; try again when it finishes")
+    try:
+        count = geocode_missing(session, geocoder, worker.bucket, args.batch_size, keep_alive=worker.lease.renew)
+    finally:
+        worker.lease.release()
+    return f"Geocoded {count} places"
+
+
+if __name__ == "__main__":
+    from . import cli
+
+    cli.main("Place geocoding maintenance", {
+        "run": cli.Command(
+            "Geocode every place that has no coordinates, then exit",
+            _geocode_all,
+            cli.arg("--batch-size", type=int, default=DEFAULT_BATCH_SIZE),
+        ),
+    })
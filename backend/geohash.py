@@ -0,0 +1,34 @@
+# backend/geohash.py
+from typing import Optional
+
+GEOHASH_PRECISION = 9 # ~5 m cells
+BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+
+def encode(latitude: float, longitude: float, precision: int = GEOHASH_PRECISION) -> str:
+    lat_range, lon_range = [-90.0, 90.0], [-180.0, 180.0]
+    chars, bits, value, even = [], 0, 0, True
+    while len(chars) < precision:
+        interval, coordinate = (lon_range, longitude) if even else (lat_range, latitude)
+        middle = (interval[0] + interval[1]) / 2
+        value <<= 1
+        if coordinate >= middle:
+            value |= 1
+            interval[0] = middle
+        else:
+            interval[1] = middle
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(BASE32[value])
+            bits, value = 0, 0
+    return "".join(chars)
+
+
+def geohash_default(context) -> Optional[str]:
+    """Column default: derives the geohash from the row's own coordinates."""
+    params = context.get_current_parameters()
+    latitude, longitude = params.get("latitude"), params.get("longitude")
+    if latitude is None or longitude is None:
+        return None
+    return encode(latitude, longitude)
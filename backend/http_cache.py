@@ -0,0 +1,53 @@
+# backend/http_cache.py
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Optional
+
+from fastapi import Request, Response
+
+
+def validator_headers(table: str, version: int, updated_at: Optional[datetime]) -> dict:
+    # Weak ETag: the representation is the same, but gzip/brotli may change the bytes
+    headers = {"ETag": f'W/"{table}-{version}"', "Cache-Control": "no-cache"}
+    if updated_at is not None:
+        headers["Last-Modified"] = format_datetime(updated_at.replace(tzinfo=timezone.utc), usegmt=True)
+    return headers
+
+
+def is_not_modified(request: Request, headers: dict) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = [tag.strip() for tag in if_none_match.split(",")]
+        return "*" in tags or headers["ETag"] in tags
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and "Last-Modified" in headers:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        return parsedate_to_datetime(headers["Last-Modified"]) <= since
+    return False
+
+
+def not_modified(headers: dict) -> Response:
+    return Response(status_code=304, headers=headers)
+
+
+def json_bytes_response(body: bytes, headers: dict) -> Response:
+    """Sends JSON that is already serialized, skipping FastAPI's jsonable_encoder pass."""
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+def precompressed_json_response(request: Request, body: bytes, gzipped: Optional[bytes], headers: dict) -> Response:
+    """Like json_bytes_response, but sends the gzipped copy to clients that accept it.
+
+    The compression middleware leaves responses that already have a Content-Encoding alone.
+    """
+    if gzipped is None or "gzip" not in request.headers.get("accept-encoding", ""):
+        return json_bytes_response(body, headers)
+    return Response(
+        content=gzipped,
+        media_type="application/json",
+        headers={**headers, "Content-Encoding": "gzip", "Vary": "Accept-Encoding"},
+    )
@@ -0,0 +1,141 @@
+# backend/image_store.py
+"""Photos stored once per content hash, with thumbnails made when they are stored.
+
+Files live under a root directory as <2 hex digits>/<sha256>/{original, lg.jpg, md.jpg,
+sm.jpg, meta.json}. meta.json is written last, so an image is either complete or absent,
+and storing the same bytes again returns the stored copy without decoding anything.
+
+Standard library only, with Pillow imported when an image is decoded, so the
+standalone 1.py demo can use it without the backend's dependencies. The API runs
+ingest() in a process pool (images.py).
+"""
+import hashlib
+import io
+import json
+import os
+import re
+import tempfile
+from typing import Optional, Tuple
+
+MAX_IMAGE_PIXELS = 60_000_000 # larger images are refused rather than decoded
+
+# Longest side in pixels, largest first: each size is resized from the previous one
+THUMBNAIL_SIZES = {"lg": 1280, "md": 480, "sm": 160}
+VARIANTS = ("original", *THUMBNAIL_SIZES)
+FORMATS = {"JPEG": "image/jpeg", "PNG": "image/png", "WEBP": "image/webp", "GIF": "image/gif"}
+THUMBNAIL_QUALITY = 82
+
+_DIGEST = re.compile(r"^[0-9a-f]{64}$")
+_LOCAL_URL = re.compile(r"^/images/([0-9a-f]{64})/\w+$")
+
+
+class InvalidImage(ValueError):
+    pass
+
+
+def digest_of(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def image_dir(root: str, digest: str) -> str:
+    return os.path.join(root, digest[:2], digest)
+
+
+def variant_path(root: str, digest: str, variant: str) -> str:
+    return os.path.join(image_dir(root, digest), "original" if variant == "original" else f"{variant}.jpg")
+
+
+def image_url(digest: str, variant: str = "lg") -> str:
+    return f"/images/{digest}/{variant}"
+
+
+def thumbnail_url(url: Optional[str], variant: str = "md") -> Optional[str]:
+    """The `variant` of an uploaded image given any of its URLs, or None for hotlinked images."""
+    match = _LOCAL_URL.match(url or "")
+    return image_url(match.group(1), variant) if match else None
+
+
+def read_meta(root: str, digest: str) -> Optional[dict]:
+    try:
+        with open(os.path.join(image_dir(root, digest), "meta.json"), encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def locate(root: str, digest: str, variant: str) -> Optional[Tuple[str, str]]:
+    """Returns (path, media type) of a stored variant, or None."""
+    if variant not in VARIANTS or not _DIGEST.match(digest):
+        return None
+    if variant == "original":
+        meta = read_meta(root, digest)
+        return (variant_path(root, digest, variant), meta["content_type"]) if meta else None
+    path = variant_path(root, digest, variant)
+    # meta.json is written after every thumbnail, so its presence means they are all there
+    if not os.path.exists(os.path.join(image_dir(root, digest), "meta.json")):
+        return None
+    return path, "image/jpeg"
+
+
+def _write_atomic(path: str, data: bytes):
+    handle, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+    try:
+        with os.fdopen(handle, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def _to_rgb(image):
+    from PIL import Image
+    if image.mode == "RGB":
+        return image
+    if image.mode in ("RGBA", "LA", "P"):
+        # JPEG has no alpha; flatten onto white like most viewers do
+        rgba = image.convert("RGBA")
+        background = Image.new("RGB", rgba.size, "white")
+        background.paste(rgba, mask=rgba.getchannel("A"))
+        return background
+    return image.convert("RGB")
+
+
+def ingest(root: str, data: bytes) -> Tuple[dict, bool]:
+    """Stores `data` and its thumbnails. Returns (meta, created). Runs in a worker process."""
+    digest = digest_of(data)
+    meta = read_meta(root, digest)
+    if meta is not None:
+        return meta, False
+
+    from PIL import Image, ImageOps
+    Image.MAX_IMAGE_PIXELS = MAX_IMAGE_PIXELS
+    try:
+        with Image.open(io.BytesIO(data)) as probe:
+            image_format = probe.format
+            probe.verify()
+        if image_format not in FORMATS:
+            raise InvalidImage(f"Unsupported image format: {image_format}")
+        image = Image.open(io.BytesIO(data))
+        width, height = image.size
+        # JPEGs can be decoded straight at a reduced scale, much faster than full size
+        image.draft("RGB", (THUMBNAIL_SIZES["lg"], THUMBNAIL_SIZES["lg"]))
+        image = _to_rgb(ImageOps.exif_transpose(image))
+    except InvalidImage:
+        raise
+    except (Image.DecompressionBombError, OSError, SyntaxError, ValueError) as e:
+        raise InvalidImage("Not a readable JPEG, PNG, WebP or GIF image") from e
+
+    os.makedirs(image_dir(root, digest), exist_ok=True)
+    _write_atomic(variant_path(root, digest, "original"), data)
+    variants = {"original": len(data)}
+    for variant, size in THUMBNAIL_SIZES.items():
+        image.thumbnail((size, size), Image.LANCZOS)
+        buffer = io.BytesIO()
+        image.save(buffer, "JPEG", quality=THUMBNAIL_QUALITY, optimize=True, progressive=True)
+        _write_atomic(variant_path(root, digest, variant), buffer.getvalue())
+        variants[variant] = buffer.tell()
+
+    meta = {"id": digest, "content_type": FORMATS[image_format], "width": width, "height": height, "bytes": variants}
+    _write_atomic(os.path.join(image_dir(root, digest), "meta.json"), json.dumps(meta).encode("utf-8"))
+    return meta, True
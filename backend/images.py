@@ -0,0 +1,48 @@
+# backend/images.py
+"""Uploaded photos for the API: where they live and the process pool that stores them.
+
+Storage, thumbnails and URLs are in image_store.py. Decoding and resizing run in a
+process pool, so Pillow is only imported there.
+"""
+import asyncio
+import os
+from typing import Tuple
+
+from .image_store import digest_of, ingest, read_meta
+from .worker_pool import WorkerPool
+
+IMAGE_ROOT = os.environ.get("IMAGE_ROOT", os.path.join(os.path.dirname(os.path.abspath(__file__)), "media"))
+MAX_IMAGE_BYTES = int(os.environ.get("MAX_IMAGE_BYTES", str(15 * 1024 * 1024)))
+IMAGE_WORKERS = int(os.environ.get("IMAGE_WORKERS", str(min(2, os.cpu_count() or 1))))
+# Uploads allowed to wait for a worker before new ones are turned away
+IMAGE_QUEUE_DEPTH = int(os.environ.get("IMAGE_QUEUE_DEPTH", "16"))
+
+
+class ImageProcessor:
+    """Decodes uploads and writes thumbnails in a small process pool, off the event loop and the GIL.
+
+    Repeat uploads are answered from meta.json without reaching the pool. New images
+    raise WorkerPoolBusy when the pool's queue is full.
+    """
+
+    def __init__(self, root: str = IMAGE_ROOT, workers: int = IMAGE_WORKERS, queue_depth: int = IMAGE_QUEUE_DEPTH):
+        self.root = root
+        self.workers = workers
+        self._pool = WorkerPool("images", workers, queue_depth)
+
+    async def ingest(self, data: bytes) -> Tuple[dict, bool]:
+        digest = await asyncio.to_thread(digest_of, data)
+        meta = read_meta(self.root, digest)
+        if meta is not None:
+            return meta, False
+        return await self._pool.run(ingest, self.root, data)
+
+    def shutdown(self):
+        self._pool.shutdown()
+
+
+image_processor = ImageProcessor()
+
+
+def get_image_processor() -> ImageProcessor:
+    return image_processor
@@ -0,0 +1,72 @@
+# backend/leases.py
+"""Expiring claims in the worker_leases table, so a background job runs in one process at a time.
+
+Every API worker (and every host) starts the same background threads. A job that must
+not run twice at once, like geocoding against a rate-limited provider, takes the lease
+before each pass, renews it while it works and releases it when the pass ends. A
+process that dies stops renewing, and the lease expires for the next taker.
+"""
+import os
+import socket
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from sqlalchemy import or_, update
+
+from . import models
+from .database import SessionLocal
+from .upsert import dialect_insert
+
+
+class LeaseLost(Exception):
+    """Another process took the lease after it expired; the current pass should stop."""
+
+
+class Lease:
+    def __init__(self, name: str, seconds: float = 60, session_factory=SessionLocal, clock=time.monotonic):
+        self.name = name
+        self.seconds = seconds
+        self.holder = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.session_factory = session_factory
+        self._clock = clock
+        self._renewed_at = None
+
+    def acquire(self) -> bool:
+        """Takes the lease, or extends it if this process holds it. Returns whether it does."""
+        leases = models.WorkerLease.__table__
+        now = datetime.utcnow()
+        expires_at = now + timedelta(seconds=self.seconds)
+        with self.session_factory() as db:
+            db.execute(
+                dialect_insert(db, leases)
+                .values(name=self.name, holder=self.holder, expires_at=expires_at)
+                .on_conflict_do_nothing(index_elements=[leases.c.name])
+            )
+            # Row locks serialize competing takers; only one matches once the first commits
+            taken = db.execute(
+                update(leases)
+                .where(leases.c.name == self.name, or_(leases.c.holder == self.holder, leases.c.expires_at < now))
+                .values(holder=self.holder, expires_at=expires_at)
+            ).rowcount == 1
+            db.commit()
+        self._renewed_at = self._clock() if taken else None
+        return taken
+
+    def renew(self):
+        """Extends the lease once a third of it has run out. Raises LeaseLost if it was taken meanwhile."""
+        if self._renewed_at is not None and self._clock() - self._renewed_at < self.seconds / 3:
+            return
+        if not self.acquire():
+            raise LeaseLost(self.name)
+
+    def release(self):
+        leases = models.WorkerLease.__table__
+        with self.session_factory() as db:
+            db.execute(
+                update(leases)
+                .where(leases.c.name == self.name, leases.c.holder == self.holder)
+                .values(expires_at=datetime.utcnow())
+            )
+            db.commit()
+        self._renewed_at = None
@@ -2,43 +2,86 @@
 from dotenv import load_dotenv
 load_dotenv() # Loads environment variables from the .env file
 
-from passlib.context import CryptContext
 from fastapi.security import OAuth2PasswordRequestForm 
 
-import googlemaps
-
-from geopy.geocoders import Nominatim
-
-from fastapi import FastAPI, Depends, HTTPException
-from sqlalchemy.orm import Session
-from typing import List
-from pydantic import BaseModel
+from fastapi import FastAPI, BackgroundTasks, Depends, File, HTTPException, Query, Request, UploadFile
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import FileResponse, PlainTextResponse, StreamingResponse
+from sqlalchemy import select, tuple_, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, joinedload, selectinload
+from typing import Dict, List, Optional
+from pydantic import BaseModel, TypeAdapter
 
 # These imports will now work correctly
 from . import models, schemas
 # ... rest of the imports
+import asyncio
+import codecs
+import json
 import os
-import google.generativeai as genai
-genai.configure(api_key=os.environ.get("GEMINI_API_KEY"))
-
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
-
-def get_password_hash(password):
-    return pwd_context.hash(password)
+from contextlib import asynccontextmanager
+from starlette.concurrency import run_in_threadpool
 
 class StoryPoints(BaseModel):
     place_name: str
     points: List[str]
 # These imports will now work correctly
 from . import models, schemas
-from .database import SessionLocal, engine
+from . import database
+from .database import AsyncSessionLocal, SessionLocal, get_engine
+from .pagination import encode_cursor, decode_cursor, encode_change_cursor, decode_change_cursor
+from .search import search_places
+from .geo import parse_bbox, places_nearby, places_within
+from .migrate import init_db
+from .ai import StoryGenerator, StoryGeneratorBusy, get_story_generator
+from .translation import TRANSLATED_FIELDS, translate_place_in_background, backfill_in_background
+from .bulk_import import BulkImporter, DEFAULT_BATCH_SIZE, iter_ndjson
+from . import geocoding
+from .auth import TokenSigner, TokenUser, get_current_user, get_token_signer
+from .passwords import PasswordHasher, get_password_hasher, password_hasher
+from . import crud, facets, image_store, images, metrics, versioning
+from .read_cache import ReadCache, get_read_cache
+from .image_store import InvalidImage
+from .images import ImageProcessor, get_image_processor, image_processor
+from .worker_pool import WorkerPoolBusy
+from .http_cache import validator_headers, is_not_modified, not_modified, json_bytes_response, precompressed_json_response
 
-# Create database tables
-models.Base.metadata.create_all(bind=engine)
+try:
+    from brotli_asgi import BrotliMiddleware # Optional: also negotiates gzip for older clients
+except ImportError:
+    BrotliMiddleware = None
+
+# Schema setup needs a live database, so it runs when the app starts serving rather
+# than when it is imported. Deployments that run `python -m backend.migrate` can skip it.
+DB_INIT_ON_STARTUP = os.environ.get("DB_INIT_ON_STARTUP", "true").lower() in ("1", "true", "yes")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if DB_INIT_ON_STARTUP:
+        await run_in_threadpool(init_db, get_engine())
+    # Coordinates are looked up behind the scenes so submissions never wait on a geocoder
+    geocoding.start_worker()
+    try:
+        yield
+    finally:
+        geocoding.stop_worker()
+        password_hasher.shutdown()
+        image_processor.shutdown()
+        if database.async_engine is not None:
+            await database.async_engine.dispose()
 
-app = FastAPI(title="గడులు & గృహాలు API")
+app = FastAPI(title="గడులు & గృహాలు API", lifespan=lifespan)
+# Stories are long text fields, so listings compress well
+if BrotliMiddleware is not None:
+    app.add_middleware(BrotliMiddleware, minimum_size=1024, excluded_handlers=["^/images/"]) # already compressed
+else:
+    app.add_middleware(GZipMiddleware, minimum_size=1024)
+# Added last so it is outermost and its timings include compression
+app.add_middleware(metrics.MetricsMiddleware)
+metrics.instrument_sql()
+
+_place_list_json = TypeAdapter(List[schemas.Place])
 
 # Dependency to get DB session
 def get_db():
@@ -48,79 +91,449 @@ def get_db():
     finally:
         db.close()
 
+# Read endpoints are coroutines on the async engine, so they never wait for a threadpool slot
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+def _find_credentials(db: Session, username: str):
+    """Returns the user's (id, username, hashed_password) row or None.
+
+    The session gives its connection back before returning, so nothing is held
+    while the password is being hashed.
+    """
+    row = db.execute(
+        select(models.User.id, models.User.username, models.User.hashed_password)
+        .where(models.User.username == username)
+    ).first()
+    db.rollback()
+    return row
+
+def _hasher_busy() -> HTTPException:
+    return HTTPException(status_code=503, detail="Too many sign-ins right now, please retry", headers={"Retry-After": "1"})
+
 @app.post("/users/", response_model=schemas.User)
-def create_user(user: schemas.UserCreate, db: Session = Depends(get_db)):
+async def create_user(
+    user: schemas.UserCreate,
+    db: Session = Depends(get_db),
+    hasher: PasswordHasher = Depends(get_password_hasher),
+):
     """Signup endpoint"""
-    db_user = db.query(models.User).filter(models.User.username == user.username).first()
-    if db_user:
+    if await run_in_threadpool(_find_credentials, db, user.username):
         raise HTTPException(status_code=400, detail="Username already registered")
-    hashed_password = get_password_hash(user.password)
-    db_user = models.User(username=user.username, hashed_password=hashed_password)
-    db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
-    return db_user
-
-@app.post("/login")
-def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
-    """Login endpoint"""
-    user = db.query(models.User).filter(models.User.username == form_data.username).first()
-    if not user or not verify_password(form_data.password, user.hashed_password):
+    try:
+        hashed_password = await hasher.hash(user.password)
+    except WorkerPoolBusy:
+        raise _hasher_busy()
+
+    def save():
+        db_user = models.User(username=user.username, hashed_password=hashed_password)
+        db.add(db_user)
+        db.commit()
+        db.refresh(db_user)
+        return db_user
+    return await run_in_threadpool(save)
+
+@app.post("/login", response_model=schemas.LoginResponse)
+async def login(
+    form_data: OAuth2PasswordRequestForm = Depends(),
+    db: Session = Depends(get_db),
+    hasher: PasswordHasher = Depends(get_password_hasher),
+    signer: TokenSigner = Depends(get_token_signer),
+):
+    """Login endpoint. Send the returned access_token as `Authorization: Bearer <token>` on writes."""
+    user = await run_in_threadpool(_find_credentials, db, form_data.username)
+    try:
+        verified, new_hash = await hasher.verify_and_update(form_data.password, user.hashed_password if user else None)
+    except WorkerPoolBusy:
+        raise _hasher_busy()
+    if not verified:
         raise HTTPException(
             status_code=401,
             detail="Incorrect username or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    return {"username": user.username, "message": "Login successful"}
+    if new_hash:
+        # Stored with an old cost factor; upgrade it while we have the plaintext
+        def rehash():
+            db.execute(update(models.User).where(models.User.id == user.id).values(hashed_password=new_hash))
+            db.commit()
+        await run_in_threadpool(rehash)
+    return schemas.LoginResponse(
+        username=user.username,
+        message="Login successful",
+        access_token=signer.issue(user.id, user.username),
+        expires_in=signer.ttl,
+    )
+
+@app.post("/logout", status_code=204)
+def logout(user: TokenUser = Depends(get_current_user), signer: TokenSigner = Depends(get_token_signer)):
+    """Revokes the token used for this request."""
+    signer.revoke(user)
 
 @app.post("/places/", response_model=schemas.Place)
-def create_place(place: schemas.PlaceCreate, db: Session = Depends(get_db)):
-    # User creation logic remains the same
-    db_user = db.query(models.User).filter(models.User.username == place.contributor_username).first()
-    if not db_user:
-        db_user = models.User(username=place.contributor_username, contributions=0)
-        db.add(db_user)
+def create_place(
+    place: schemas.PlaceSubmission,
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_db),
+    user: TokenUser = Depends(get_current_user),
+):
+    db_place = crud.create_place(db, schemas.PlaceCreate(**place.model_dump(), contributor_username=user.username))
+    # Translations are stored once here instead of being computed by every reader
+    background_tasks.add_task(translate_place_in_background, db_place.id)
+    if db_place.latitude is None:
+        geocoding.notify_worker()
+    return db_place
 
-    db_user.contributions += 1
+def _translation_options(lang: Optional[str]):
+    if not lang or lang == "en":
+        return []
+    return [selectinload(models.Place.translations.and_(models.PlaceTranslation.lang == lang))]
 
-    place_dict = place.dict(exclude={"contributor_username"})
+def _localize(place: models.Place, lang: Optional[str]) -> schemas.Place:
+    """Overlays the stored translation for `lang`, falling back to the original text."""
+    result = schemas.Place.model_validate(place)
+    if not lang or lang == "en":
+        return result
+    for translation in place.translations:
+        if translation.lang == lang:
+            return result.model_copy(update={
+                field: getattr(translation, field) for field in TRANSLATED_FIELDS if getattr(translation, field)
+            })
+    return result
 
-    # The entire geocoding block has been removed from here
+STORY_EXCERPT_CHARS = 280
 
-    # Convert empty strings to None before saving
-    for key, value in place_dict.items():
-        if value == "":
-            place_dict[key] = None
+def _excerpt(place: schemas.Place) -> schemas.Place:
+    """The place with its story cut at a word boundary to about STORY_EXCERPT_CHARS."""
+    if len(place.story) <= STORY_EXCERPT_CHARS:
+        return place
+    cut = place.story[:STORY_EXCERPT_CHARS].rsplit(None, 1)[0]
+    return place.model_copy(update={"story": cut.rstrip(" ,;:.") + "…"})
 
-    db_place = models.Place(**place_dict, contributor=db_user)
-    db.add(db_place)
-    db.commit()
-    db.refresh(db_place)
-    return db_place
+async def _place_validators(request: Request, db: AsyncSession):
+    """Returns (headers, not_modified) for the current version of the places table."""
+    headers = validator_headers(versioning.PLACES, *await db.run_sync(versioning.current))
+    return headers, is_not_modified(request, headers)
+
+async def _cached_read(request: Request, db: AsyncSession, cache: ReadCache, kind: str, key, render):
+    """Serves a read from the read cache, or renders and stores it on a miss.
+
+    `render(headers)` returns the JSON body and may add headers. A hit costs no
+    database round trip; both paths answer 304 to a matching If-None-Match.
+    """
+    entry = cache.get(kind, key)
+    if entry is None:
+        # Rendered even when the ETag already matches: the validators are table-wide, and
+        # render() is what answers 404 for a place that does not exist
+        generation = cache.generation
+        headers, _ = await _place_validators(request, db)
+        entry = cache.set(kind, key, await render(headers), headers, generation)
+    if is_not_modified(request, entry.headers):
+        return not_modified(entry.headers)
+    return precompressed_json_response(request, entry.body, entry.gzipped, entry.headers)
+
+@app.post("/places/bulk", response_model=schemas.BulkImportReport)
+async def bulk_import_places(
+    request: Request,
+    background_tasks: BackgroundTasks,
+    batch_size: int = Query(DEFAULT_BATCH_SIZE, ge=1, le=10000),
+    db: Session = Depends(get_db),
+    user: TokenUser = Depends(get_current_user),
+):
+    """Bulk ingest from an NDJSON body, one place per line (API or stories.json record shape).
+
+    The body is streamed and written in batches. Rows that fail are listed in `errors`
+    and do not abort the rest of the import. Every place is credited to the signed-in
+    user; contributors named in the records are ignored. To keep them, use
+    `python -m backend.bulk_import` on the server.
+    """
+    importer = BulkImporter(db, batch_size, contributor=user.username)
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    pending, remainder, next_line = [], "", 1
+    async for chunk in request.stream():
+        *lines, remainder = (remainder + decoder.decode(chunk)).split("\n")
+        pending.extend(lines)
+        if len(pending) >= batch_size:
+            await run_in_threadpool(importer.add_many, iter_ndjson(pending, start=next_line))
+            next_line += len(pending)
+            pending = []
+    pending.append(remainder + decoder.decode(b"", final=True))
+    await run_in_threadpool(importer.add_many, iter_ndjson(pending, start=next_line))
+    report = await run_in_threadpool(importer.finish)
+    if report.inserted:
+        background_tasks.add_task(backfill_in_background)
+        geocoding.notify_worker()
+    return report
 
 @app.get("/places/", response_model=List[schemas.Place])
-def read_places(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    places = db.query(models.Place).offset(skip).limit(limit).all()
-    return places
+async def read_places(
+    request: Request,
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=500),
+    lang: Optional[str] = None,
+    region: Optional[str] = None,
+    type: Optional[str] = None,
+    era: Optional[str] = None,
+    tag: Optional[str] = None,
+    summary: bool = False,
+    db: AsyncSession = Depends(get_async_db),
+    cache: ReadCache = Depends(get_read_cache),
+):
+    """Newest-first listing. Pass the X-Next-Cursor header back as `cursor` for the next page.
+
+    `region`, `type`, `era` and `tag` filter the listing (values as returned by /places/facets).
+    With `lang` (e.g. `te`), text fields come from the stored translations where available.
+    With `summary=true`, stories are cut to a short excerpt; GET /places/{id} has the full text.
+    Supports If-None-Match / If-Modified-Since and answers 304 when nothing has changed.
+    Pages are served from the read cache until the next write.
+    """
+    query = (
+        select(models.Place)
+        .options(joinedload(models.Place.contributor), *_translation_options(lang))
+        .order_by(models.Place.created_at.desc(), models.Place.id.desc())
+        .limit(limit + 1)
+    )
+    if region:
+        query = query.where(models.Place.region == region)
+    if type:
+        query = query.where(models.Place.type == type)
+    if era:
+        query = query.where(models.Place.era == era)
+    # Whole-tag match within the comma-separated list (not indexed; facet counts say how many to expect)
+    tags = tuple(facets.split_tags(tag))
+    for item in tags:
+        query = query.where(facets.has_tag(models.Place.tags, item))
+    if cursor:
+        try:
+            created_at, place_id = decode_cursor(cursor)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        query = query.where(tuple_(models.Place.created_at, models.Place.id) < (created_at, place_id))
+
+    async def render(headers):
+        places = (await db.scalars(query)).all()
+        if len(places) > limit:
+            places = places[:limit]
+            last = places[-1]
+            headers["X-Next-Cursor"] = encode_cursor(last.created_at, last.id)
+        localized = [_localize(place, lang) for place in places]
+        return _place_list_json.dump_json([_excerpt(place) for place in localized] if summary else localized)
+
+    key = (cursor, limit, lang, region, type, era, tags, summary)
+    return await _cached_read(request, db, cache, "list", key, render)
+
+@app.get("/places/changes", response_model=schemas.PlaceChanges)
+async def read_place_changes(
+    request: Request,
+    since: Optional[str] = None,
+    limit: int = Query(500, ge=1, le=1000),
+    lang: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Places created or modified after `since`, oldest change first.
+
+    Start without `since`, then keep passing back `next_cursor`. Poll again right away while `has_more` is true.
+    Send the previous ETag in If-None-Match to get a 304 when nothing has changed.
+    """
+    headers, unchanged = await _place_validators(request, db)
+    if unchanged:
+        return not_modified(headers)
+
+    query = (
+        select(models.Place)
+        .options(joinedload(models.Place.contributor), *_translation_options(lang))
+        # change_version follows commit order, unlike updated_at, so a row committed after
+        # a poll can never land behind the cursor that poll handed out
+        .order_by(models.Place.change_version, models.Place.id)
+        .limit(limit + 1)
+    )
+    if since:
+        try:
+            version, place_id = decode_change_cursor(since)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        query = query.where(tuple_(models.Place.change_version, models.Place.id) > (version, place_id))
+
+    places = (await db.scalars(query)).all()
+    has_more = len(places) > limit
+    places = places[:limit]
+    next_cursor = encode_change_cursor(places[-1].change_version, places[-1].id) if places else since
+    changes = schemas.PlaceChanges(
+        places=[_localize(place, lang) for place in places],
+        next_cursor=next_cursor,
+        has_more=has_more,
+    )
+    return json_bytes_response(changes.model_dump_json().encode(), headers)
+
+@app.get("/places/facets", response_model=Dict[str, List[schemas.FacetValue]])
+async def read_facets(
+    request: Request,
+    db: AsyncSession = Depends(get_async_db),
+    cache: ReadCache = Depends(get_read_cache),
+):
+    """Region, type, era and tag values with place counts, read from the maintained facet table."""
+    async def render(headers):
+        return json.dumps(await db.run_sync(facets.read_facets), ensure_ascii=False).encode("utf-8")
+    return await _cached_read(request, db, cache, "facets", None, render)
+
+@app.get("/places/nearby", response_model=List[schemas.PlaceNearby])
+async def read_places_nearby(
+    lat: float = Query(..., ge=-90, le=90),
+    lon: float = Query(..., ge=-180, le=180),
+    radius_km: float = Query(10, gt=0, le=500),
+    limit: int = Query(20, ge=1, le=100),
+    lang: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Places with coordinates within `radius_km` of (lat, lon), nearest first."""
+    return [
+        schemas.PlaceNearby(**_localize(place, lang).model_dump(), distance_km=round(distance, 3))
+        for place, distance in await db.run_sync(places_nearby, lat, lon, radius_km, limit, _translation_options(lang))
+    ]
+
+@app.get("/places/within", response_model=List[schemas.Place])
+async def read_places_within(
+    request: Request,
+    bbox: str = Query(..., description="south,west,north,east in degrees"),
+    limit: int = Query(500, ge=1, le=2000),
+    lang: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Places inside a bounding box, e.g. the visible area of a map."""
+    try:
+        box = parse_bbox(bbox)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    headers, unchanged = await _place_validators(request, db)
+    if unchanged:
+        return not_modified(headers)
+    places = await db.run_sync(places_within, box, limit, _translation_options(lang))
+    return json_bytes_response(_place_list_json.dump_json([_localize(place, lang) for place in places]), headers)
+
+@app.get("/places/search", response_model=List[schemas.PlaceSearchResult])
+async def search(
+    q: str = Query(..., min_length=1),
+    limit: int = Query(20, ge=1, le=100),
+    lang: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Full-text search over name, story and tags, best matches first."""
+    return [
+        schemas.PlaceSearchResult(**_localize(place, lang).model_dump(), rank=rank, snippet=snippet)
+        for place, rank, snippet in await db.run_sync(search_places, q, limit, _translation_options(lang))
+    ]
+
+# Registered after the fixed /places/... paths so they are not read as an id
+@app.get("/places/{place_id}", response_model=schemas.Place)
+async def read_place(
+    request: Request,
+    place_id: int,
+    lang: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db),
+    cache: ReadCache = Depends(get_read_cache),
+):
+    """One place with its full story, served from the read cache until the next write."""
+    async def render(headers):
+        place = (await db.scalars(
+            select(models.Place)
+            .options(joinedload(models.Place.contributor), *_translation_options(lang))
+            .where(models.Place.id == place_id)
+        )).first()
+        if place is None:
+            raise HTTPException(status_code=404, detail="Place not found")
+        return _localize(place, lang).model_dump_json().encode()
+    return await _cached_read(request, db, cache, "detail", (place_id, lang), render)
+
+# Stored images never change: the URL contains the hash of their content
+_IMAGE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+@app.post("/images", response_model=schemas.ImageUpload)
+async def upload_image(
+    file: UploadFile = File(...),
+    user: TokenUser = Depends(get_current_user),
+    processor: ImageProcessor = Depends(get_image_processor),
+):
+    """Stores a JPEG, PNG, WebP or GIF photo and its thumbnails. Put the returned `url` in a place's image_url."""
+    data = await file.read(images.MAX_IMAGE_BYTES + 1)
+    if len(data) > images.MAX_IMAGE_BYTES:
+        raise HTTPException(status_code=413, detail=f"Images are limited to {images.MAX_IMAGE_BYTES // (1024 * 1024)} MB")
+    if not data:
+        raise HTTPException(status_code=400, detail="Empty upload")
+    try:
+        meta, created = await processor.ingest(data)
+    except InvalidImage as e:
+        raise HTTPException(status_code=415, detail=str(e))
+    except WorkerPoolBusy:
+        raise HTTPException(status_code=503, detail="Too many uploads right now, please retry", headers={"Retry-After": "2"})
+    return schemas.ImageUpload(
+        id=meta["id"],
+        url=image_store.image_url(meta["id"], "lg"),
+        thumbnails={variant: image_store.image_url(meta["id"], variant) for variant in image_store.VARIANTS},
+        content_type=meta["content_type"],
+        width=meta["width"],
+        height=meta["height"],
+        deduplicated=not created,
+    )
+
+@app.get("/images/{image_id}/{variant}")
+def read_image(image_id: str, variant: str, request: Request, processor: ImageProcessor = Depends(get_image_processor)):
+    """An uploaded image: `original`, or the `lg` (1280 px), `md` (480 px) or `sm` (160 px) JPEG thumbnail."""
+    found = image_store.locate(processor.root, image_id, variant)
+    if found is None:
+        raise HTTPException(status_code=404, detail="Image not found")
+    path, media_type = found
+    headers = {"ETag": f'"{image_id}-{variant}"', "Cache-Control": _IMAGE_CACHE_CONTROL}
+    if is_not_modified(request, headers):
+        return not_modified(headers)
+    return FileResponse(path, media_type=media_type, headers=headers)
 
 @app.post("/ai/generate-story")
-async def get_ai_story(story_points: StoryPoints):
-    model = genai.GenerativeModel('gemini-1.5-flash')
-    
+async def get_ai_story(story_points: StoryPoints, generator: StoryGenerator = Depends(get_story_generator)):
     if not story_points.points:
         raise HTTPException(status_code=400, detail="No points provided for story generation.")
-        
-    prompt = f"""
-    You are a historical storyteller for a cultural heritage project called "గడులు & గృహాలు".
-    Your task is to weave the following key points about a place named "{story_points.place_name}" into a short, engaging, and respectful narrative story of about 2-3 paragraphs.
 
-    Key Points:
-    - {'\n- '.join(story_points.points)}
-
-    Generated Story:
-    """
     try:
-        response = model.generate_content(prompt)
-        return {"story": response.text}
+        story = await generator.generate(story_points.place_name, story_points.points)
+        return {"story": story}
+    except StoryGeneratorBusy:
+        raise HTTPException(status_code=503, detail="Too many story requests right now, please retry", headers={"Retry-After": "5"})
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail="AI story generation timed out")
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"AI story generation failed: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"AI story generation failed: {str(e)}")
+
+
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+def read_metrics():
+    """Prometheus scrape endpoint: request latency by route, SQL statements per request and external call timings."""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+def _sse(data: dict, event: Optional[str] = None) -> str:
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+@app.post("/ai/generate-story/stream")
+async def stream_ai_story(story_points: StoryPoints, generator: StoryGenerator = Depends(get_story_generator)):
+    """Same as /ai/generate-story, but sends the story as Server-Sent Events while it is written."""
+    if not story_points.points:
+        raise HTTPException(status_code=400, detail="No points provided for story generation.")
+
+    async def events():
+        try:
+            async for chunk in generator.stream(story_points.place_name, story_points.points):
+                yield _sse({"text": chunk})
+            yield _sse({}, event="done")
+        except StoryGeneratorBusy:
+            yield _sse({"detail": "Too many story requests right now, please retry"}, event="error")
+        except asyncio.TimeoutError:
+            yield _sse({"detail": "AI story generation timed out"}, event="error")
+        except Exception as e:
+            yield _sse({"detail": f"AI story generation failed: {str(e)}"}, event="error")
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -0,0 +1,308 @@
+# backend/metrics.py
+"""Request, SQL and external-call instrumentation, exposed in Prometheus text format.
+
+`MetricsMiddleware` times every request by route template. The SQLAlchemy cursor
+hooks installed by `instrument_sql` count each statement against the request that
+issued it, wherever it ran (event loop, threadpool or the async engine's greenlet),
+and `timed` wraps calls to Gemini, the translator, the geocoder and bcrypt. Figures
+are per process; with several workers, scrape each of them or sum in Prometheus.
+
+With SLOW_REQUEST_MS set, requests slower than that are logged with the SQL they ran.
+"""
+import contextvars
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+SLOW_REQUEST_MS = float(os.environ.get("SLOW_REQUEST_MS", "0")) # 0 disables the slow-request log
+SLOW_REQUEST_MAX_QUERIES = 50 # statements listed per slow request
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 50, 100)
+
+Labels = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Labels, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_number(value: float) -> str:
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+        self._values: Dict[Labels, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels: str, amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels: str) -> float:
+        return self._values.get(labels, 0)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for labels, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.label_names, labels)} {_format_number(value)}")
+        return lines
+
+
+class Gauge:
+    def __init__(self, name: str, documentation: str):
+        self.name = name
+        self.documentation = documentation
+        self._value = 0.0
+
+    def set(self, value: float):
+        self._value = value
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} gauge", f"{self.name} {_format_number(self._value)}"]
+
+
+class Histogram:
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [per-bucket counts (last one is +Inf), sum]
+        self._series: Dict[Labels, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels: str):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def count(self, *labels: str) -> int:
+        series = self._series.get(labels)
+        return sum(series[0]) if series else 0
+
+    def total(self, *labels: str) -> float:
+        series = self._series.get(labels)
+        return series[1] if series else 0.0
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            snapshot = sorted((labels, list(counts), total) for labels, (counts, total) in self._series.items())
+        for labels, counts, total in snapshot:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else _format_number(bound)
+                bucket_labels = _format_labels(self.label_names, labels, 'le="%s"' % le)
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.label_names, labels)} {_format_number(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.label_names, labels)} {cumulative}")
+        return lines
+
+
+REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds", "Time from receiving a request to sending the last byte of its response.",
+    ("method", "route", "status"),
+)
+DB_QUERIES_PER_REQUEST = Histogram(
+    "db_queries_per_request", "SQL statements executed while handling one request.",
+    ("method", "route"), QUERY_COUNT_BUCKETS,
+)
+DB_QUERY_DURATION = Histogram(
+    "db_query_duration_seconds", "Execution time of single SQL statements, by the route that issued them.",
+    ("route",),
+)
+EXTERNAL_CALL_DURATION = Histogram(
+    "external_call_duration_seconds", "Time spent in calls to outside services and the password hasher.",
+    ("service", "operation", "outcome"),
+)
+SLOW_REQUESTS = Counter("http_slow_requests_total", "Requests slower than SLOW_REQUEST_MS.", ("method", "route"))
+
+REGISTRY = [REQUEST_DURATION, DB_QUERIES_PER_REQUEST, DB_QUERY_DURATION, EXTERNAL_CALL_DURATION, SLOW_REQUESTS]
+
+
+def register(*collectors):
+    """Adds metrics defined elsewhere to the /metrics output."""
+    REGISTRY.extend(collectors)
+
+
+def render() -> str:
+    return "\n".join(line for metric in REGISTRY for line in metric.render()) + "\n"
+
+
+class RequestStats:
+    """What one request spent its time on. Shared by every thread the request's work runs on."""
+
+    def __init__(self, scope=None):
+        self.scope = scope if scope is not None else {}
+        self.queries: List[Tuple[str, float]] = [] # (statement, seconds)
+        self.external: List[Tuple[str, float]] = [] # ("service.operation", seconds)
+        self.finished = False
+        self._lock = threading.Lock()
+
+    @property
+    def route(self) -> str:
+        # Set by the router before the endpoint runs; unknown paths all share one label
+        route = self.scope.get("route")
+        return getattr(route, "path", None) or "unmatched"
+
+    def close(self) -> bool:
+        """Stops recording. Returns False if the request was already closed."""
+        with self._lock:
+            if self.finished:
+                return False
+            self.finished = True
+            return True
+
+    def add_query(self, statement: str, seconds: float):
+        with self._lock:
+            if not self.finished:
+                self.queries.append((statement, seconds))
+
+    def add_external(self, name: str, seconds: float):
+        with self._lock:
+            if not self.finished:
+                self.external.append((name, seconds))
+
+
+_current: contextvars.ContextVar[Optional[RequestStats]] = contextvars.ContextVar("request_stats", default=None)
+
+
+def current_request() -> Optional[RequestStats]:
+    return _current.get()
+
+
+@contextmanager
+def timed(service: str, operation: str):
+    """Records how long the block took under external_call_duration_seconds."""
+    started = time.perf_counter()
+    outcome = "error"
+    try:
+        yield
+        outcome = "ok"
+    finally:
+        seconds = time.perf_counter() - started
+        EXTERNAL_CALL_DURATION.observe(seconds, service, operation, outcome)
+        stats = _current.get()
+        if stats is not None:
+            stats.add_external(f"{service}.{operation}", seconds)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("metrics_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.get("metrics_started")
+    if not started:
+        return
+    seconds = time.perf_counter() - started.pop()
+    stats = _current.get()
+    if stats is None or stats.finished:
+        # Workers, CLIs and background tasks that run after the response was sent
+        DB_QUERY_DURATION.observe(seconds, "background")
+        return
+    DB_QUERY_DURATION.observe(seconds, stats.route)
+    stats.add_query(statement, seconds)
+
+
+def _handle_error(exception_context):
+    # A failed statement never reaches after_cursor_execute
+    connection = exception_context.connection
+    if connection is not None and connection.info.get("metrics_started"):
+        connection.info["metrics_started"].pop()
+
+
+def instrument_sql():
+    """Times every statement on every engine, including the async engine's sync core."""
+    if not event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+        event.listen(Engine, "handle_error", _handle_error)
+
+
+def _log_slow_request(method: str, stats: RequestStats, status, seconds: float):
+    SLOW_REQUESTS.inc(method, stats.route)
+    query_seconds = sum(s for _, s in stats.queries)
+    lines = [
+        f"Slow request {method} {stats.route} -> {status} in {seconds * 1000:.0f} ms: "
+        f"{len(stats.queries)} queries ({query_seconds * 1000:.0f} ms)"
+    ]
+    lines += [f"  {name}: {s * 1000:.0f} ms" for name, s in stats.external]
+    for statement, s in stats.queries[:SLOW_REQUEST_MAX_QUERIES]:
+        lines.append(f"  {s * 1000:7.1f} ms  {' '.join(statement.split())[:500]}")
+    if len(stats.queries) > SLOW_REQUEST_MAX_QUERIES:
+        lines.append(f"  ... {len(stats.queries) - SLOW_REQUEST_MAX_QUERIES} more")
+    logger.warning("\n".join(lines))
+
+
+class MetricsMiddleware:
+    """ASGI middleware: per-route latency, status and SQL statement counts for every HTTP request.
+
+    A request is measured up to the last byte of its response, so background tasks that run
+    afterwards are not charged to it.
+    """
+
+    def __init__(self, app, slow_request_ms: float = SLOW_REQUEST_MS):
+        self.app = app
+        self.slow_request_seconds = slow_request_ms / 1000 if slow_request_ms > 0 else None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats(scope)
+        token = _current.set(stats)
+        started = time.perf_counter()
+        status = 500
+
+        def finish():
+            if not stats.close():
+                return
+            seconds = time.perf_counter() - started
+            method = scope["method"]
+            REQUEST_DURATION.observe(seconds, method, stats.route, str(status))
+            DB_QUERIES_PER_REQUEST.observe(len(stats.queries), method, stats.route)
+            if self.slow_request_seconds is not None and seconds >= self.slow_request_seconds:
+                _log_slow_request(method, stats, status, seconds)
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+            if message["type"] == "http.response.body" and not message.get("more_body", False):
+                finish()
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            finish()
+            _current.reset(token)
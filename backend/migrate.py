@@ -0,0 +1,95 @@
+# backend/migrate.py
+"""Creates and upgrades the tables and the dialect-specific indexes.
+
+create_all only creates missing tables, so databases made by an earlier release are
+brought up to date here: columns added to existing tables, indexes declared on the
+models, then backfills for the rows that predate them. Every step checks before it
+acts, so this is safe to run on every start.
+
+The API runs this from its lifespan hook unless DB_INIT_ON_STARTUP=false, so
+deployments can run it once per release instead:
+
+    python -m backend.migrate
+"""
+import logging
+
+if __name__ == "__main__":
+    # Before any backend import, so backend/.env applies to everything below
+    from dotenv import load_dotenv
+    load_dotenv()
+
+from sqlalchemy import inspect, text
+from sqlalchemy.orm import Session
+from sqlalchemy.schema import CreateIndex
+
+from . import facets, geo, models
+from .geo import create_spatial_index
+from .search import create_search_index
+
+logger = logging.getLogger(__name__)
+
+
+def add_missing_columns(conn):
+    """ALTER TABLE ... ADD COLUMN for model columns an existing table lacks. Returns them as "table.column"."""
+    inspector = inspect(conn)
+    quote = conn.dialect.identifier_preparer.quote
+    added = []
+    for table in models.Base.metadata.sorted_tables:
+        existing = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing:
+                continue
+            # Added columns are nullable; Python-side defaults apply to new rows and backfills cover old ones
+            conn.execute(text(
+                f"ALTER TABLE {quote(table.name)} ADD COLUMN {quote(column.name)} {column.type.compile(dialect=conn.dialect)}"
+            ))
+            added.append(f"{table.name}.{column.name}")
+    return added
+
+
+def create_missing_indexes(conn):
+    """CREATE INDEX IF NOT EXISTS for every index declared on the models."""
+    for table in models.Base.metadata.sorted_tables:
+        for index in sorted(table.indexes, key=lambda index: index.name):
+            conn.execute(CreateIndex(index, if_not_exists=True))
+
+
+def backfill(bind, new_tables):
+    """Fills in derived values for rows written before the columns or tables existed."""
+    with bind.begin() as conn:
+        conn.execute(text("UPDATE places SET updated_at = created_at WHERE updated_at IS NULL"))
+        conn.execute(text("UPDATE places SET change_version = 0 WHERE change_version IS NULL"))
+    with Session(bind=bind) as db:
+        geohashes = geo.reindex(db)
+        if geohashes:
+            logger.info("Computed geohashes for %d places", geohashes)
+        tidied = facets.normalize_stored_tags(db)
+        if tidied:
+            logger.info("Normalized tags of %d places", tidied)
+        if models.PlaceFacet.__tablename__ in new_tables:
+            facets.rebuild(db)
+
+
+def init_db(bind):
+    """Idempotent: creates what is missing and leaves everything else alone."""
+    existing_tables = set(inspect(bind).get_table_names())
+    models.Base.metadata.create_all(bind=bind)
+    new_tables = {table.name for table in models.Base.metadata.sorted_tables} - existing_tables
+    with bind.begin() as conn:
+        added = add_missing_columns(conn)
+        create_missing_indexes(conn)
+    for column in added:
+        logger.info("Added column %s", column)
+    backfill(bind, new_tables)
+    create_search_index(bind)
+    create_spatial_index(bind)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+
+    from .database import get_engine
+
+    engine = get_engine()
+    init_db(engine)
+    print(f"Schema ready on {engine.url.render_as_string(hide_password=True)}")
@@ -1,11 +1,12 @@
 # backend/models.py
 
-from sqlalchemy import Column, Integer, String, Float, ForeignKey, DateTime, Text
+from sqlalchemy import Column, Integer, String, Float, ForeignKey, DateTime, Text, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime  # <--- ADD THIS LINE
 
 # Import Base from the database.py file
 from .database import Base
+from .geohash import geohash_default
 
 # In backend/models.py, inside the User class
 class User(Base):
@@ -30,7 +31,69 @@ class Place(Base):
     image_url = Column(String)
     latitude = Column(Float, nullable=True)
     longitude = Column(Float, nullable=True)
+    # Derived from latitude/longitude on insert; indexed for /places/nearby and /places/within
+    geohash = Column(String(12), nullable=True, index=True, default=geohash_default)
     created_at = Column(DateTime, default=datetime.utcnow) # This line now works
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    # The places table version (versioning.bump) of the last write to this row; 0 before tracking began
+    change_version = Column(Integer, default=0)
     
     contributor_id = Column(Integer, ForeignKey("users.id"))
     contributor = relationship("User", back_populates="places")
+    translations = relationship("PlaceTranslation", back_populates="place", cascade="all, delete-orphan")
+
+    # Supports keyset pagination on (created_at, id) for GET /places/
+    __table_args__ = (
+        Index("ix_places_created_at_id", "created_at", "id"),
+        # Drives GET /places/changes
+        Index("ix_places_change_version_id", "change_version", "id"),
+        # Filtered listings, still in newest-first keyset order
+        Index("ix_places_region_created_at_id", "region", "created_at", "id"),
+        Index("ix_places_type_created_at_id", "type", "created_at", "id"),
+    )
+
+
+# Machine translations of a place's text fields, filled in the background after writes
+class PlaceTranslation(Base):
+    __tablename__ = "place_translations"
+    place_id = Column(Integer, ForeignKey("places.id", ondelete="CASCADE"), primary_key=True)
+    lang = Column(String(8), primary_key=True)
+    name = Column(String)
+    type = Column(String)
+    era = Column(String)
+    story = Column(Text)
+
+    place = relationship("Place", back_populates="translations")
+
+
+# Cheap change counters used for ETags and cache invalidation
+class TableVersion(Base):
+    __tablename__ = "table_versions"
+    name = Column(String, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
+
+# Per-value counts for the Explore filters, kept current on every write
+class PlaceFacet(Base):
+    __tablename__ = "place_facets"
+    facet = Column(String, primary_key=True) # region, type, era or tag
+    value = Column(String, primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+
+
+# Geocoder answers keyed by normalized "area|region"; NULL coordinates record "not found"
+class GeocodeCache(Base):
+    __tablename__ = "geocode_cache"
+    key = Column(String, primary_key=True)
+    latitude = Column(Float, nullable=True)
+    longitude = Column(Float, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+
+# Which process runs a one-at-a-time background job (e.g. geocoding), until expires_at
+class WorkerLease(Base):
+    __tablename__ = "worker_leases"
+    name = Column(String, primary_key=True)
+    holder = Column(String, nullable=False)
+    expires_at = Column(DateTime, nullable=False)
@@ -0,0 +1,36 @@
+# backend/pagination.py
+import base64
+from datetime import datetime
+
+
+# Cursors are opaque to clients: a url-safe base64 of "<key>|<id>".
+def _encode(key: str, row_id: int) -> str:
+    raw = f"{key}|{row_id}"
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def _decode(cursor: str):
+    padded = cursor + "=" * (-len(cursor) % 4)
+    key, row_id = base64.urlsafe_b64decode(padded.encode("ascii")).decode("utf-8").split("|")
+    return key, int(row_id)
+
+
+def encode_cursor(timestamp: datetime, row_id: int) -> str:
+    return _encode(timestamp.isoformat(), row_id)
+
+
+def decode_cursor(cursor: str):
+    """Returns (timestamp, id). Raises ValueError for malformed cursors."""
+    timestamp, row_id = _decode(cursor)
+    return datetime.fromisoformat(timestamp), row_id
+
+
+# GET /places/changes pages by (change_version, id) instead of a timestamp
+def encode_change_cursor(version: int, row_id: int) -> str:
+    return _encode(str(version), row_id)
+
+
+def decode_change_cursor(cursor: str):
+    """Returns (change_version, id). Raises ValueError for malformed cursors, including timestamp ones."""
+    version, row_id = _decode(cursor)
+    return int(version), row_id
@@ -0,0 +1,64 @@
+# backend/passwords.py
+import os
+from functools import lru_cache
+from typing import Optional, Tuple
+
+from .worker_pool import WorkerPool
+
+BCRYPT_ROUNDS = int(os.environ.get("BCRYPT_ROUNDS", "12"))
+PASSWORD_WORKERS = int(os.environ.get("PASSWORD_WORKERS", str(min(4, os.cpu_count() or 1))))
+# Hashes allowed to wait for a worker before new requests are turned away
+PASSWORD_QUEUE_DEPTH = int(os.environ.get("PASSWORD_QUEUE_DEPTH", "32"))
+
+
+@lru_cache(maxsize=None)
+def get_pwd_context():
+    """Built on first use; only the hashing worker processes normally need passlib."""
+    from passlib.context import CryptContext
+    # Hashes made with any other cost are flagged by needs_update and replaced on the next login
+    return CryptContext(
+        schemes=["bcrypt"],
+        deprecated="auto",
+        bcrypt__rounds=BCRYPT_ROUNDS,
+        bcrypt__min_rounds=BCRYPT_ROUNDS,
+        bcrypt__max_rounds=BCRYPT_ROUNDS,
+    )
+
+
+def hash_password(password: str) -> str:
+    return get_pwd_context().hash(password)
+
+
+def verify_and_update(password: str, hashed_password: Optional[str]) -> Tuple[bool, Optional[str]]:
+    """Returns (matches, replacement hash or None). Unknown users cost the same as a wrong password."""
+    if not hashed_password:
+        get_pwd_context().dummy_verify()
+        return False, None
+    return get_pwd_context().verify_and_update(password, hashed_password)
+
+
+class PasswordHasher:
+    """Runs bcrypt in a small process pool so it never occupies the request threadpool or the GIL.
+
+    Raises WorkerPoolBusy when the pool's queue is full.
+    """
+
+    def __init__(self, workers: int = PASSWORD_WORKERS, queue_depth: int = PASSWORD_QUEUE_DEPTH):
+        self.workers = workers
+        self._pool = WorkerPool("bcrypt", workers, queue_depth)
+
+    async def hash(self, password: str) -> str:
+        return await self._pool.run(hash_password, password)
+
+    async def verify_and_update(self, password: str, hashed_password: Optional[str]) -> Tuple[bool, Optional[str]]:
+        return await self._pool.run(verify_and_update, password, hashed_password)
+
+    def shutdown(self):
+        self._pool.shutdown()
+
+
+password_hasher = PasswordHasher()
+
+
+def get_password_hasher() -> PasswordHasher:
+    return password_hasher
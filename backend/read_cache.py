@@ -0,0 +1,175 @@
+# backend/read_cache.py
+"""In-process cache of rendered place reads (list pages, facets, place details).
+
+Entries are serialized response bodies with their validator headers, kept in an
+LRU bounded by entry count and bytes, each with a time-to-live. Every write path
+calls versioning.bump(); once that transaction commits, the whole cache is dropped
+and the generation counter moves on, so a read that started before the write cannot
+store its now-stale result.
+
+Workers on the same host learn about each other's writes through a signal file that
+the writer replaces on every invalidation. Readers compare its inode and mtime with
+the last ones seen, at the cost of one stat() per lookup. Other hosts, and writers
+with READ_CACHE_SIGNAL_PATH=none, are covered by the TTL.
+"""
+import gzip
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Hashable, NamedTuple, Optional
+
+from . import metrics
+from .database import database_url
+
+logger = logging.getLogger(__name__)
+
+READ_CACHE_MAX_BYTES = int(os.environ.get("READ_CACHE_MAX_BYTES", str(64 * 1024 * 1024))) # 0 disables the cache
+READ_CACHE_MAX_ENTRIES = int(os.environ.get("READ_CACHE_MAX_ENTRIES", "2048"))
+READ_CACHE_TTL_SECONDS = float(os.environ.get("READ_CACHE_TTL_SECONDS", "300"))
+# Bodies at least this large are also kept gzipped, so hits are not recompressed on every request
+GZIP_MIN_SIZE = 1024
+
+
+def _default_signal_path() -> str:
+    # One file per database, so workers serving the same database share it
+    database = hashlib.sha1(database_url().encode("utf-8")).hexdigest()[:12]
+    return os.path.join(tempfile.gettempdir(), f"gadulu-read-cache-{database}.signal")
+
+
+READ_CACHE_SIGNAL_PATH = os.environ.get("READ_CACHE_SIGNAL_PATH") or _default_signal_path()
+
+LOOKUPS = metrics.Counter("read_cache_lookups_total", "Read cache lookups by kind of read and result.", ("kind", "result"))
+INVALIDATIONS = metrics.Counter(
+    "read_cache_invalidations_total", "Times the read cache was dropped, by a local write or another worker's signal.", ("source",),
+)
+ENTRIES = metrics.Gauge("read_cache_entries", "Entries currently held in the read cache.")
+SIZE_BYTES = metrics.Gauge("read_cache_bytes", "Approximate bytes held in the read cache.")
+metrics.register(LOOKUPS, INVALIDATIONS, ENTRIES, SIZE_BYTES)
+
+
+class CachedRead(NamedTuple):
+    body: bytes
+    gzipped: Optional[bytes]
+    headers: dict
+
+
+class ReadCache:
+    """Thread-safe LRU of CachedRead entries with a TTL, a byte budget and a generation counter."""
+
+    def __init__(
+        self,
+        max_bytes: int = READ_CACHE_MAX_BYTES,
+        max_entries: int = READ_CACHE_MAX_ENTRIES,
+        ttl: float = READ_CACHE_TTL_SECONDS,
+        signal_path: Optional[str] = READ_CACHE_SIGNAL_PATH,
+        clock=time.monotonic,
+    ):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.signal_path = None if (signal_path or "none").lower() == "none" else signal_path
+        self.generation = 0
+        self._clock = clock
+        self._data = OrderedDict() # key -> (expires_at, size, CachedRead)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._signal_seen = self._signal_stamp()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0 and self.max_entries > 0
+
+    def _signal_stamp(self):
+        if self.signal_path is None:
+            return None
+        try:
+            stat = os.stat(self.signal_path)
+        except OSError:
+            return None
+        return stat.st_ino, stat.st_mtime_ns
+
+    def _check_signal(self):
+        stamp = self._signal_stamp()
+        if stamp != self._signal_seen:
+            self._signal_seen = stamp
+            self._clear("signal")
+
+    def _clear(self, source: str):
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+            self.generation += 1
+        INVALIDATIONS.inc(source)
+        ENTRIES.set(0)
+        SIZE_BYTES.set(0)
+
+    def get(self, kind: str, key: Hashable) -> Optional[CachedRead]:
+        if not self.enabled:
+            return None
+        if self.signal_path is not None:
+            self._check_signal()
+        with self._lock:
+            entry = self._data.get((kind, key))
+            if entry is not None and entry[0] <= self._clock():
+                self._bytes -= entry[1]
+                del self._data[(kind, key)]
+                entry = None
+            if entry is not None:
+                self._data.move_to_end((kind, key))
+        LOOKUPS.inc(kind, "hit" if entry is not None else "miss")
+        return entry[2] if entry is not None else None
+
+    def set(self, kind: str, key: Hashable, body: bytes, headers: dict, generation: int) -> CachedRead:
+        """Stores an entry built at `generation`, unless a write has committed since. Returns the entry."""
+        if not self.enabled:
+            return CachedRead(body, None, headers)
+        entry = CachedRead(body, gzip.compress(body, 6) if len(body) >= GZIP_MIN_SIZE else None, dict(headers))
+        size = len(body) + len(entry.gzipped or b"") + sum(len(k) + len(v) for k, v in headers.items())
+        if size > self.max_bytes:
+            return entry
+        with self._lock:
+            if generation != self.generation:
+                return entry
+            previous = self._data.pop((kind, key), None)
+            if previous is not None:
+                self._bytes -= previous[1]
+            self._data[(kind, key)] = (self._clock() + self.ttl, size, entry)
+            self._bytes += size
+            while self._bytes > self.max_bytes or len(self._data) > self.max_entries:
+                _, (_, evicted_size, _) = self._data.popitem(last=False)
+                self._bytes -= evicted_size
+            entries, size_bytes = len(self._data), self._bytes
+        ENTRIES.set(entries)
+        SIZE_BYTES.set(size_bytes)
+        return entry
+
+    def invalidate(self):
+        """Drops every entry here and tells the other workers to do the same."""
+        self._clear("local")
+        if self.signal_path is None:
+            return
+        try:
+            directory = os.path.dirname(self.signal_path) or "."
+            handle, tmp_path = tempfile.mkstemp(dir=directory, prefix=".read-cache-")
+            with os.fdopen(handle, "w") as f:
+                f.write(f"{os.getpid()} {time.time_ns()}\n")
+            # A new inode each time, so readers notice even within one mtime tick
+            os.replace(tmp_path, self.signal_path)
+            self._signal_seen = self._signal_stamp()
+        except OSError:
+            logger.warning("Could not write the read cache signal file %s", self.signal_path, exc_info=True)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"entries": len(self._data), "bytes": self._bytes, "generation": self.generation}
+
+
+read_cache = ReadCache()
+
+
+def get_read_cache() -> ReadCache:
+    return read_cache
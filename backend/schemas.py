@@ -1,14 +1,24 @@
 # schemas.py
-from pydantic import BaseModel
-from typing import List, Optional
+from pydantic import BaseModel, computed_field, field_validator
+from typing import Dict, List, Optional
 from datetime import datetime
 
+from . import image_store
+from .facets import normalize_tags
+
 class UserBase(BaseModel):
     username: str
 
 class UserCreate(UserBase):
     password: str # Add the password field for signup
 
+class LoginResponse(BaseModel):
+    username: str
+    message: str
+    access_token: str
+    token_type: str = "bearer"
+    expires_in: int
+
 class User(UserBase):
     id: int
     badge: str
@@ -22,20 +32,76 @@ class PlaceBase(BaseModel):
     type: str
     region: str
     area: Optional[str] = None
-    era: str
+    era: Optional[str] = None
     story: str
     tags: Optional[str] = None
     image_url: Optional[str] = None
     latitude: Optional[float] = None
     longitude: Optional[float] = None
 
+    # Stored as "a, b, c" so the listing's tag filter can match whole tags
+    @field_validator("tags")
+    @classmethod
+    def normalize_tags(cls, tags):
+        return normalize_tags(tags)
+
+# Body of POST /places/: the contributor is the signed-in user, never a request field
+class PlaceSubmission(PlaceBase):
+    pass
+
 class PlaceCreate(PlaceBase):
     contributor_username: str
 
 class Place(PlaceBase):
     id: int
     created_at: datetime
+    updated_at: Optional[datetime] = None
     contributor: User
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+    @computed_field
+    @property
+    def thumbnail_url(self) -> Optional[str]:
+        # Listing-sized version of an uploaded image; None for hotlinked URLs
+        return image_store.thumbnail_url(self.image_url, "md")
+
+class PlaceSearchResult(Place):
+    rank: float
+    snippet: Optional[str] = None
+
+
+class PlaceChanges(BaseModel):
+    places: List[Place]
+    next_cursor: Optional[str] = None
+    has_more: bool = False
+
+
+class BulkImportError(BaseModel):
+    ref: str # Line number for NDJSON, slug for stories.json
+    error: str
+
+class BulkImportReport(BaseModel):
+    inserted: int
+    failed: int
+    errors: List[BulkImportError]
+
+
+class PlaceNearby(Place):
+    distance_km: float
+
+
+class FacetValue(BaseModel):
+    value: str
+    count: int
+
+
+class ImageUpload(BaseModel):
+    id: str # sha256 of the uploaded bytes
+    url: str # use as a place's image_url
+    thumbnails: Dict[str, str]
+    content_type: str
+    width: int
+    height: int
+    deduplicated: bool # the same bytes were already stored
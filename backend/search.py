@@ -0,0 +1,122 @@
+# backend/search.py
+import re
+
+from sqlalchemy import select, text
+from sqlalchemy.orm import Session, joinedload
+
+from . import models
+
+# Telugu vowel signs, virama and other combining marks. unicode61 treats them as
+# separators by default, which splits "వరంగల్" into meaningless fragments.
+_TELUGU_MARKS = "".join(
+    chr(c) for c in [*range(0x0C00, 0x0C05), *range(0x0C3C, 0x0C57), 0x0C62, 0x0C63]
+)
+_SQLITE_TOKENIZER = f"unicode61 remove_diacritics 0 tokenchars '{_TELUGU_MARKS}'"
+
+# The same expression is used for the GIN index and for queries, so Postgres can use the index.
+_PG_DOCUMENT = (
+    "to_tsvector('simple'::regconfig, coalesce(name, '') || ' ' || coalesce(story, '') || ' ' || coalesce(tags, ''))"
+)
+
+_SQLITE_DDL = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS places_fts USING fts5(
+        name, story, tags, content='places', content_rowid='id', tokenize="{_SQLITE_TOKENIZER}")""",
+    """CREATE TRIGGER IF NOT EXISTS places_fts_ai AFTER INSERT ON places BEGIN
+        INSERT INTO places_fts(rowid, name, story, tags) VALUES (new.id, new.name, new.story, new.tags);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS places_fts_ad AFTER DELETE ON places BEGIN
+        INSERT INTO places_fts(places_fts, rowid, name, story, tags) VALUES ('delete', old.id, old.name, old.story, old.tags);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS places_fts_au AFTER UPDATE OF name, story, tags ON places BEGIN
+        INSERT INTO places_fts(places_fts, rowid, name, story, tags) VALUES ('delete', old.id, old.name, old.story, old.tags);
+        INSERT INTO places_fts(rowid, name, story, tags) VALUES (new.id, new.name, new.story, new.tags);
+    END""",
+]
+
+_POSTGRES_DDL = [
+    f"CREATE INDEX IF NOT EXISTS ix_places_search ON places USING gin ({_PG_DOCUMENT})",
+]
+
+SNIPPET_START, SNIPPET_STOP = "<b>", "</b>"
+
+
+def create_search_index(bind):
+    """Creates the text index for the current dialect. Safe to run on every startup."""
+    with bind.begin() as conn:
+        if conn.dialect.name == "sqlite":
+            existed = conn.execute(
+                text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'places_fts'")
+            ).first()
+            for stmt in _SQLITE_DDL:
+                conn.execute(text(stmt))
+            if not existed:
+                # Index rows that were written before the FTS table existed
+                conn.execute(text("INSERT INTO places_fts(places_fts) VALUES ('rebuild')"))
+        elif conn.dialect.name == "postgresql":
+            for stmt in _POSTGRES_DDL:
+                conn.execute(text(stmt))
+
+
+def _terms(query: str):
+    return re.findall(r"[\w\u0C00-\u0C7F]+", query.lower())
+
+
+def _ranked_ids_sqlite(db: Session, terms, limit):
+    match = " ".join(f'"{term}"*' for term in terms)
+    rows = db.execute(
+        text(
+            "SELECT rowid, -bm25(places_fts) AS rank, "
+            "snippet(places_fts, -1, :start, :stop, '…', 24) AS snippet "
+            "FROM places_fts WHERE places_fts MATCH :match ORDER BY bm25(places_fts) LIMIT :limit"
+        ),
+        {"match": match, "start": SNIPPET_START, "stop": SNIPPET_STOP, "limit": limit},
+    )
+    return rows.all()
+
+
+def _ranked_ids_postgres(db: Session, terms, limit):
+    tsquery = " & ".join(f"{term}:*" for term in terms)
+    rows = db.execute(
+        text(
+            f"""
+            SELECT hits.id, hits.rank,
+                   ts_headline('simple', coalesce(p.name, '') || ' — ' || coalesce(p.story, ''), hits.query,
+                               'StartSel={SNIPPET_START}, StopSel={SNIPPET_STOP}, MaxWords=30, MinWords=10') AS snippet
+            FROM (
+                SELECT id, ts_rank_cd({_PG_DOCUMENT}, q) AS rank, q AS query
+                FROM places, to_tsquery('simple', :tsquery) q
+                WHERE {_PG_DOCUMENT} @@ q
+                ORDER BY rank DESC
+                LIMIT :limit
+            ) hits JOIN places p ON p.id = hits.id
+            ORDER BY hits.rank DESC
+            """
+        ),
+        {"tsquery": tsquery, "limit": limit},
+    )
+    return rows.all()
+
+
+def search_places(db: Session, query: str, limit: int = 20, options=()):
+    """Returns [(Place, rank, snippet)] ordered by relevance. `options` are extra loader options for the places."""
+    terms = _terms(query)
+    if not terms:
+        return []
+
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        hits = _ranked_ids_postgres(db, terms, limit)
+    elif dialect == "sqlite":
+        hits = _ranked_ids_sqlite(db, terms, limit)
+    else:
+        raise NotImplementedError(f"Full-text search is not supported on {dialect}")
+    if not hits:
+        return []
+
+    places = db.scalars(
+        select(models.Place)
+        .options(joinedload(models.Place.contributor), *options)
+        .where(models.Place.id.in_([hit[0] for hit in hits]))
+    ).all()
+    by_id = {place.id: place for place in places}
+    return [(by_id[place_id], rank, snippet) for place_id, rank, snippet in hits if place_id in by_id]
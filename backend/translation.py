@@ -0,0 +1,179 @@
+# backend/translation.py
+import json
+import logging
+import os
+from datetime import datetime
+from typing import Dict, List
+
+from sqlalchemy import and_, select, update
+from sqlalchemy.orm import Session
+
+from . import metrics, models, versioning
+from .database import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+TRANSLATED_FIELDS = ("name", "type", "era", "story")
+
+# Google Translate v2 accepts at most 128 segments per request
+_MAX_SEGMENTS_PER_REQUEST = 128
+
+
+def target_languages() -> List[str]:
+    return [lang.strip() for lang in os.environ.get("TRANSLATION_LANGUAGES", "te").split(",") if lang.strip()]
+
+
+class GoogleTranslator:
+    def __init__(self):
+        from google.cloud import translate_v2 as translate
+        self._client = translate.Client()
+
+    def translate_batch(self, texts: List[str], target: str, source: str = "en") -> List[str]:
+        translated = []
+        for i in range(0, len(texts), _MAX_SEGMENTS_PER_REQUEST):
+            chunk = texts[i:i + _MAX_SEGMENTS_PER_REQUEST]
+            response = self._client.translate(chunk, target_language=target, source_language=source)
+            translated.extend(item["translatedText"] for item in response)
+        return translated
+
+
+class DictionaryTranslator:
+    """Offline translator backed by a {lang: {text: translation}} mapping.
+
+    Unknown strings come back unchanged. Useful for tests and local runs.
+    """
+
+    def __init__(self, entries: Dict[str, Dict[str, str]] = None):
+        self.entries = entries or {}
+
+    @classmethod
+    def from_file(cls, path: str):
+        with open(path, encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    def translate_batch(self, texts: List[str], target: str, source: str = "en") -> List[str]:
+        table = self.entries.get(target, {})
+        return [table.get(text, text) for text in texts]
+
+
+_translator = None
+_unavailable = False # The provider could not be built; translation stays off until set_translator()
+
+
+def get_translator():
+    """Builds the provider named by TRANSLATION_PROVIDER (google, dictionary or none) on first use.
+
+    Returns None when translation is off, including when the Google client cannot be
+    built (library missing, no credentials); that is logged once, not on every write.
+    """
+    global _translator, _unavailable
+    if _translator is None and not _unavailable:
+        provider = os.environ.get("TRANSLATION_PROVIDER", "google")
+        if provider == "google":
+            try:
+                _translator = GoogleTranslator()
+            except Exception as e:
+                _unavailable = True
+                logger.warning("Google Translate is unavailable (%s); places will not be translated", e)
+        elif provider == "dictionary":
+            path = os.environ.get("TRANSLATION_DICTIONARY")
+            _translator = DictionaryTranslator.from_file(path) if path else DictionaryTranslator()
+        elif provider == "none":
+            _translator = None
+            return None
+        else:
+            raise ValueError(f"Unknown TRANSLATION_PROVIDER: {provider}")
+    return _translator
+
+
+def set_translator(translator):
+    global _translator, _unavailable
+    _translator = translator
+    _unavailable = False
+
+
+def translate_places(db: Session, place_ids: List[int], languages: List[str] = None):
+    """Stores translations of the given places for every target language, in one batch per language."""
+    translator = get_translator()
+    if translator is None or not place_ids:
+        return
+    places = db.scalars(select(models.Place).where(models.Place.id.in_(place_ids))).all()
+    texts = list(dict.fromkeys(
+        getattr(place, field) for place in places for field in TRANSLATED_FIELDS if getattr(place, field)
+    ))
+    for lang in languages or target_languages():
+        translated = {}
+        if texts:
+            with metrics.timed("translation", "translate_batch"):
+                translated = dict(zip(texts, translator.translate_batch(texts, lang)))
+        for place in places:
+            db.merge(models.PlaceTranslation(
+                place_id=place.id,
+                lang=lang,
+                **{field: translated.get(getattr(place, field), getattr(place, field)) for field in TRANSLATED_FIELDS},
+            ))
+    # Let delta-sync clients know the places have new translations
+    version = versioning.bump(db)
+    db.execute(
+        update(models.Place)
+        .where(models.Place.id.in_([place.id for place in places]))
+        .values(updated_at=datetime.utcnow(), change_version=version)
+    )
+    db.commit()
+
+
+def translate_place_in_background(place_id: int):
+    db = SessionLocal()
+    try:
+        translate_places(db, [place_id])
+    except Exception:
+        logger.exception("Translating place %s failed", place_id)
+    finally:
+        db.close()
+
+
+def backfill_in_background():
+    db = SessionLocal()
+    try:
+        backfill(db)
+    except Exception:
+        logger.exception("Translation backfill failed")
+    finally:
+        db.close()
+
+
+def backfill(db: Session, languages: List[str] = None, batch_size: int = 100) -> int:
+    """Translates every place that is missing a translation. Returns the number of places translated."""
+    if get_translator() is None:
+        return 0
+    total = 0
+    for lang in languages or target_languages():
+        while True:
+            missing = db.scalars(
+                select(models.Place.id)
+                .outerjoin(models.PlaceTranslation, and_(
+                    models.PlaceTranslation.place_id == models.Place.id,
+                    models.PlaceTranslation.lang == lang,
+                ))
+                .where(models.PlaceTranslation.place_id.is_(None))
+                .order_by(models.Place.id)
+                .limit(batch_size)
+            ).all()
+            if not missing:
+                break
+            translate_places(db, missing, [lang])
+            total += len(missing)
+    return total
+
+
+if __name__ == "__main__":
+    from . import cli
+
+    cli.main("Place translation maintenance", {
+        "backfill": cli.Command(
+            "Translate places that have no stored translation",
+            lambda session, args: f"Translated {backfill(session, args.lang, args.batch_size)} places",
+            cli.arg("--lang", action="append", help="Target language (repeatable, default: TRANSLATION_LANGUAGES)"),
+            cli.arg("--batch-size", type=int, default=100),
+        ),
+    })
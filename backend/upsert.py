@@ -0,0 +1,16 @@
+# backend/upsert.py
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+_DIALECT_INSERTS = {
+    "postgresql": postgresql.insert,
+    "sqlite": sqlite.insert,
+}
+
+
+def dialect_insert(db: Session, table):
+    """An INSERT that supports ON CONFLICT DO UPDATE for the session's database."""
+    dialect = db.get_bind().dialect.name
+    if dialect not in _DIALECT_INSERTS:
+        raise NotImplementedError(f"INSERT ... ON CONFLICT is not supported on {dialect}")
+    return _DIALECT_INSERTS[dialect](table)
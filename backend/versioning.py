@@ -0,0 +1,54 @@
+# backend/versioning.py
+from datetime import datetime
+
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+
+from . import models
+from .read_cache import read_cache
+from .upsert import dialect_insert
+
+PLACES = "places"
+
+
+def bump(db: Session, table: str = PLACES):
+    """Increments the change counter for `table` as part of the caller's transaction and returns the new version.
+
+    The counter row stays locked until the caller commits, so versions are handed out
+    in commit order. Writers stamp the rows they touch with it (Place.change_version),
+    which makes it a cursor that no later commit can land behind. Cached reads are
+    dropped once the transaction commits.
+    """
+    db.info["tables_changed"] = True
+    now = datetime.utcnow()
+    versions = models.TableVersion.__table__
+    # One upsert, so concurrent first writers to a fresh database do not race to insert the row
+    return db.execute(
+        dialect_insert(db, versions)
+        .values(name=table, version=1, updated_at=now)
+        .on_conflict_do_update(
+            index_elements=[versions.c.name],
+            set_={"version": versions.c.version + 1, "updated_at": now},
+        )
+        .returning(versions.c.version)
+    ).scalar_one()
+
+
+def current(db: Session, table: str = PLACES):
+    """Returns (version, updated_at) for `table`; (0, None) before the first write."""
+    row = db.execute(
+        select(models.TableVersion.version, models.TableVersion.updated_at)
+        .where(models.TableVersion.name == table)
+    ).first()
+    return (row.version, row.updated_at) if row else (0, None)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_reads(session):
+    if session.info.pop("tables_changed", False):
+        read_cache.invalidate()
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_changes(session):
+    session.info.pop("tables_changed", None)
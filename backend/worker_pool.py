@@ -0,0 +1,63 @@
+# backend/worker_pool.py
+"""A small process pool with admission control, for CPU-bound work kept off the GIL.
+
+Used for bcrypt (passwords.py) and image decoding (images.py). At most
+`workers + queue_depth` calls are admitted at once; beyond that WorkerPoolBusy is
+raised immediately instead of letting requests pile up.
+"""
+import asyncio
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from . import metrics
+
+# Workers start from a fork server rather than a fork of the API process, which by then
+# runs other threads whose locks a forked child would inherit mid-use. Windows has no
+# fork server; spawn is its default anyway.
+_START_METHOD = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+
+
+class WorkerPoolBusy(Exception):
+    """Every worker is busy and the queue is full; the caller should answer 503."""
+
+
+class WorkerPool:
+    """Runs picklable functions in worker processes, timed as `service` in the metrics."""
+
+    def __init__(self, service: str, workers: int, queue_depth: int):
+        self.service = service
+        self.workers = workers
+        self._admitted = threading.BoundedSemaphore(workers + queue_depth)
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _pool(self) -> ProcessPoolExecutor:
+        # Created on first use so importing the app starts no processes. Workers run at a
+        # lower priority (where supported) so request handling wins when CPUs are scarce.
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers, mp_context=multiprocessing.get_context(_START_METHOD),
+                    initializer=getattr(os, "nice", None), initargs=(10,),
+                )
+            return self._executor
+
+    async def run(self, fn, *args):
+        if not self._admitted.acquire(blocking=False):
+            raise WorkerPoolBusy()
+        try:
+            future = self._pool().submit(fn, *args)
+        except Exception:
+            self._admitted.release()
+            raise
+        future.add_done_callback(lambda _: self._admitted.release())
+        with metrics.timed(self.service, fn.__name__):
+            return await asyncio.wrap_future(future)
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
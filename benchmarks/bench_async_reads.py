@@ -0,0 +1,106 @@
+"""Throughput of GET /places/ on the async engine vs. the previous threadpool handler.
+
+Seeds a database, then drives both handlers in-process with `--concurrency`
+simultaneous clients and reports requests/sec and p50/p99 latency.
+
+    python -m benchmarks.bench_async_reads --requests 2000 --concurrency 200
+    python -m benchmarks.bench_async_reads --database-url postgresql://localhost/bench
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+
+def seed(models, engine, count):
+    from sqlalchemy import insert
+    models.Base.metadata.drop_all(engine)
+    models.Base.metadata.create_all(engine)
+    now = datetime.utcnow()
+    with engine.begin() as conn:
+        user_id = conn.execute(insert(models.User.__table__).values(username="bench_user", contributions=count)).inserted_primary_key[0]
+        conn.execute(insert(models.Place.__table__), [
+            {
+                "name": f"Bench Fort {i}", "type": "Fortress", "region": "Warangal", "era": "12th Century CE",
+                "story": "A benchmark story. " * 20, "tags": "Stone", "contributor_id": user_id,
+                "created_at": now - timedelta(seconds=i), "updated_at": now - timedelta(seconds=i),
+            }
+            for i in range(count)
+        ])
+
+
+async def drive(app, path, requests, concurrency, limit):
+    import httpx
+    latencies = []
+    slots = asyncio.Semaphore(concurrency)
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=300) as client:
+        async def one():
+            async with slots:
+                started = time.perf_counter()
+                response = await client.get(path, params={"limit": limit})
+                response.raise_for_status()
+                latencies.append((time.perf_counter() - started) * 1000)
+
+        started = time.perf_counter()
+        await asyncio.gather(*[one() for _ in range(requests)])
+        seconds = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "requests_per_sec": round(requests / seconds, 1),
+        "p50_ms": round(statistics.median(latencies), 1),
+        "p99_ms": round(latencies[int(len(latencies) * 0.99) - 1], 1),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", help="Defaults to a temporary SQLite file")
+    parser.add_argument("--places", type=int, default=2000)
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args()
+
+    # The app reads its configuration at import time
+    os.environ["DATABASE_URL"] = args.database_url or f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+    os.environ.setdefault("GEOCODING_PROVIDER", "none")
+
+    from fastapi import Depends
+    from sqlalchemy import select
+    from sqlalchemy.orm import Session, joinedload
+
+    from backend import database, main, models, versioning
+
+    def legacy_read_places(limit: int = 100, db: Session = Depends(main.get_db)):
+        # The previous handler shape: a sync session on a threadpool thread
+        headers = main.validator_headers(versioning.PLACES, *versioning.current(db))
+        places = db.scalars(
+            select(models.Place)
+            .options(joinedload(models.Place.contributor))
+            .order_by(models.Place.created_at.desc(), models.Place.id.desc())
+            .limit(limit)
+        ).all()
+        return main.json_bytes_response(main._place_list_json.dump_json([main._localize(p, None) for p in places]), headers)
+
+    seed(models, database.get_engine(), args.places)
+    main.app.get("/bench/places-sync")(legacy_read_places)
+
+    async def run_all():
+        results = []
+        for name, path in [("sync session (threadpool)", "/bench/places-sync"), ("async session", "/places/")]:
+            await drive(main.app, path, min(args.requests, 50), args.concurrency, args.limit) # warm up
+            results.append({"name": name, **await drive(main.app, path, args.requests, args.concurrency, args.limit)})
+        if database.async_engine is not None:
+            await database.async_engine.dispose()
+        return results
+
+    print(json.dumps({
+        "database": database.get_engine().url.get_backend_name(),
+        "concurrency": args.concurrency,
+        "results": asyncio.run(run_all()),
+    }, indent=2))
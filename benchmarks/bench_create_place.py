@@ -0,0 +1,103 @@
+"""Concurrency check and throughput benchmark for the create_place write path.
+
+Starts N threads that each submit M places as the same contributor. It runs once with
+the previous read-modify-write implementation and once with crud.create_place, and
+reports requests/sec and whether users.contributions equals the number of places stored.
+
+    python -m benchmarks.bench_create_place --threads 16 --per-thread 50
+    python -m benchmarks.bench_create_place --database-url postgresql://localhost/bench
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import sessionmaker
+
+
+def legacy_create_place(db, place):
+    from backend import models, schemas
+    # The original handler: SELECT user, Python-side increment, INSERT, COMMIT, refresh
+    db_user = db.query(models.User).filter(models.User.username == place.contributor_username).first()
+    if not db_user:
+        db_user = models.User(username=place.contributor_username, contributions=0)
+        db.add(db_user)
+    db_user.contributions += 1
+    place_dict = place.model_dump(exclude={"contributor_username"})
+    db_place = models.Place(**place_dict, contributor=db_user)
+    db.add(db_place)
+    db.commit()
+    db.refresh(db_place)
+    return schemas.Place.model_validate(db_place)
+
+
+def run(name, create, engine, threads, per_thread):
+    from backend import models, schemas
+    models.Base.metadata.drop_all(engine)
+    models.Base.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine, autoflush=False)
+    username = "bench_user"
+    # Create the contributor up front so the legacy path races on the UPDATE, not the INSERT
+    with Session() as db:
+        db.add(models.User(username=username, contributions=0))
+        db.commit()
+
+    def worker(thread_id):
+        errors = 0
+        for i in range(per_thread):
+            place = schemas.PlaceCreate(
+                name=f"Bench Fort {thread_id}-{i}", type="Fortress", region="Warangal",
+                era="12th Century CE", story="A benchmark story. " * 40, contributor_username=username,
+            )
+            with Session() as db:
+                try:
+                    create(db, place)
+                except Exception:
+                    errors += 1
+        return errors
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        errors = sum(pool.map(worker, range(threads)))
+    elapsed = time.perf_counter() - started
+
+    with Session() as db:
+        stored = db.scalar(select(func.count()).select_from(models.Place))
+        contributions = db.scalar(select(models.User.contributions).where(models.User.username == username))
+    return {
+        "path": name,
+        "requests": threads * per_thread,
+        "errors": errors,
+        "seconds": round(elapsed, 3),
+        "requests_per_sec": round(threads * per_thread / elapsed, 1),
+        "places_stored": stored,
+        "contributions": contributions,
+        "lost_increments": stored - contributions,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", help="Defaults to a temporary SQLite file")
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--per-thread", type=int, default=50)
+    args = parser.parse_args()
+
+    url = args.database_url or f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+    # Set before importing backend, so nothing in it can reach the default Postgres URL
+    os.environ["DATABASE_URL"] = url
+    from backend import crud
+
+    connect_args = {"check_same_thread": False, "timeout": 30} if url.startswith("sqlite") else {}
+    engine = create_engine(url, connect_args=connect_args, pool_size=args.threads, max_overflow=0)
+
+    results = [
+        run("before (read-modify-write)", legacy_create_place, engine, args.threads, args.per_thread),
+        run("after (atomic upsert + RETURNING)", crud.create_place, engine, args.threads, args.per_thread),
+    ]
+    print(json.dumps(results, indent=2, ensure_ascii=False))
+    if results[-1]["lost_increments"] != 0 or results[-1]["errors"] != 0:
+        raise SystemExit("create_place lost contribution increments under concurrency")
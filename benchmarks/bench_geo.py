@@ -0,0 +1,108 @@
+"""Latency benchmark for nearest-site and bounding-box queries.
+
+Loads N random places spread over Telangana, then times places_nearby() and
+places_within() around random points and reports p50/p95/max in milliseconds.
+Exits non-zero when the nearby p95 misses the target.
+
+    python -m benchmarks.bench_geo --places 100000 --queries 200
+    python -m benchmarks.bench_geo --database-url postgresql://localhost/bench
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+# Roughly Telangana
+SOUTH, WEST, NORTH, EAST = 15.8, 77.2, 19.9, 81.3
+
+
+def load(engine, count, seed):
+    from backend import geo, models
+    from backend.geohash import encode
+    models.Base.metadata.drop_all(engine)
+    models.Base.metadata.create_all(engine)
+    geo.create_spatial_index(engine)
+    rng = random.Random(seed)
+    with engine.begin() as conn:
+        user_id = conn.execute(insert(models.User.__table__).values(username="bench_user", contributions=count)).inserted_primary_key[0]
+        for start in range(0, count, 5000):
+            rows = []
+            for i in range(start, min(start + 5000, count)):
+                latitude, longitude = rng.uniform(SOUTH, NORTH), rng.uniform(WEST, EAST)
+                rows.append({
+                    "name": f"Site {i}", "type": "Fortress", "region": "Bench", "era": None, "story": "s",
+                    "tags": "", "latitude": latitude, "longitude": longitude,
+                    "geohash": encode(latitude, longitude), "contributor_id": user_id,
+                })
+            conn.execute(insert(models.Place.__table__), rows)
+
+
+def percentiles(samples):
+    samples = sorted(samples)
+    return {
+        "p50_ms": round(statistics.median(samples), 2),
+        "p95_ms": round(samples[int(len(samples) * 0.95) - 1], 2),
+        "max_ms": round(samples[-1], 2),
+    }
+
+
+def timed(fn, points):
+    samples = []
+    for point in points:
+        started = time.perf_counter()
+        fn(*point)
+        samples.append((time.perf_counter() - started) * 1000)
+    return percentiles(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--places", type=int, default=100_000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--radius-km", type=float, default=10)
+    parser.add_argument("--bbox-degrees", type=float, default=0.5, help="Side of the bounding boxes for places_within")
+    parser.add_argument("--target-ms", type=float, default=50)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--database-url", help="Defaults to a temporary SQLite file")
+    args = parser.parse_args()
+
+    url = args.database_url or f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+    # Set before importing backend, so nothing in it can reach the default Postgres URL
+    os.environ["DATABASE_URL"] = url
+    from backend import geo
+
+    engine = create_engine(url)
+
+    started = time.perf_counter()
+    load(engine, args.places, args.seed)
+    load_seconds = time.perf_counter() - started
+
+    rng = random.Random(args.seed + 1)
+    points = [(rng.uniform(SOUTH, NORTH), rng.uniform(WEST, EAST)) for _ in range(args.queries)]
+    Session = sessionmaker(bind=engine)
+    with Session() as db:
+        nearby = timed(lambda lat, lon: geo.places_nearby(db, lat, lon, args.radius_km, 20), points)
+        half = args.bbox_degrees / 2
+        within = timed(lambda lat, lon: geo.places_within(db, (lat - half, lon - half, lat + half, lon + half), 500), points)
+
+    print(json.dumps({
+        "places": args.places,
+        "queries": args.queries,
+        "load_seconds": round(load_seconds, 1),
+        "numpy": geo.numpy() is not None,
+        "nearby": nearby,
+        "within": within,
+        "target_ms": args.target_ms,
+    }, indent=2))
+    if nearby["p95_ms"] > args.target_ms:
+        raise SystemExit(f"places_nearby p95 {nearby['p95_ms']} ms is over the {args.target_ms} ms target")
+
+
+if __name__ == "__main__":
+    main()
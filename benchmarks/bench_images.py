@@ -0,0 +1,84 @@
+"""Image ingest time and listing page weight, original photos vs. the md thumbnails.
+
+Generates `--images` distinct phone-sized JPEGs, ingests them through ImageProcessor
+(the same process pool POST /images uses), then reports ingest p50/max, the
+time to answer a repeated upload, and the bytes a 20-card listing page would
+download with originals vs. thumbnails. Exits non-zero when thumbnails do not cut
+page weight at least `--min-reduction` times.
+
+    python -m benchmarks.bench_images --images 20 --width 4032 --height 3024
+"""
+import argparse
+import asyncio
+import io
+import json
+import os
+import statistics
+import tempfile
+import time
+
+
+def synthetic_photo(seed: int, width: int, height: int) -> bytes:
+    from PIL import Image, ImageFilter
+    # Smooth gradients with some grain compress roughly like a real photo
+    base = Image.linear_gradient("L").resize((width, height)).rotate(seed * 37 % 360, expand=False)
+    noise = Image.effect_noise((width // 4, height // 4), 40 + seed % 20).resize((width, height)).filter(ImageFilter.GaussianBlur(2))
+    image = Image.merge("RGB", (base, noise, Image.blend(base, noise, 0.5)))
+    buffer = io.BytesIO()
+    image.save(buffer, "JPEG", quality=90)
+    return buffer.getvalue()
+
+
+async def run(processor, photos):
+    ingest_ms, ids = [], []
+    for data in photos:
+        started = time.perf_counter()
+        meta, _ = await processor.ingest(data)
+        ingest_ms.append((time.perf_counter() - started) * 1000)
+        ids.append(meta["id"])
+    started = time.perf_counter()
+    await processor.ingest(photos[0])
+    repeat_ms = (time.perf_counter() - started) * 1000
+    return ingest_ms, repeat_ms, ids
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--images", type=int, default=20)
+    parser.add_argument("--width", type=int, default=4032)
+    parser.add_argument("--height", type=int, default=3024)
+    parser.add_argument("--page-size", type=int, default=20)
+    parser.add_argument("--min-reduction", type=float, default=10)
+    args = parser.parse_args()
+
+    # Images never touch the database, but backend must not reach the default Postgres URL either
+    os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}")
+    from backend.image_store import variant_path
+    from backend.images import ImageProcessor
+
+    root = tempfile.mkdtemp()
+    photos = [synthetic_photo(i, args.width, args.height) for i in range(args.images)]
+    processor = ImageProcessor(root=root)
+    try:
+        ingest_ms, repeat_ms, ids = asyncio.run(run(processor, photos))
+    finally:
+        processor.shutdown()
+
+    page = ids[:args.page_size]
+    page_bytes = {
+        variant: sum(os.path.getsize(variant_path(root, digest, variant)) for digest in page)
+        for variant in ("original", "lg", "md", "sm")
+    }
+    reduction = page_bytes["original"] / page_bytes["md"]
+    print(json.dumps({
+        "images": args.images,
+        "size": f"{args.width}x{args.height}",
+        "ingest_p50_ms": round(statistics.median(ingest_ms), 1),
+        "ingest_max_ms": round(max(ingest_ms), 1),
+        "repeat_upload_ms": round(repeat_ms, 2),
+        "page_cards": len(page),
+        "page_bytes": page_bytes,
+        "page_weight_reduction_md": round(reduction, 1),
+    }, indent=2))
+    if reduction < args.min_reduction:
+        raise SystemExit(f"md thumbnails only cut page weight {reduction:.1f}x (target {args.min_reduction}x)")
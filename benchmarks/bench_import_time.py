@@ -0,0 +1,74 @@
+"""Import-time budget for the API.
+
+Imports backend.main in fresh interpreters under `python -X importtime`, keeps the
+fastest of `--runs`, and prints the total and the slowest modules by self time.
+Exits non-zero when the total exceeds `--budget-ms` or when a module that should
+only load on first use (SDKs, passlib, numpy, Pillow) was imported.
+
+    python -m benchmarks.bench_import_time
+    python -m benchmarks.bench_import_time --budget-ms 800 --runs 5
+"""
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+
+# Heavy or optional packages that must stay out of the import path of backend.main
+DEFERRED = ("google.generativeai", "google.cloud", "googlemaps", "geopy", "passlib", "bcrypt", "numpy", "PIL", "psycopg2", "asyncpg")
+
+_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)")
+
+
+def measure(env):
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import backend.main"],
+        env=env, capture_output=True, text=True,
+    )
+    if completed.returncode != 0:
+        raise SystemExit(f"Importing backend.main failed:\n{completed.stderr[-2000:]}")
+    modules = {}
+    for line in completed.stderr.splitlines():
+        match = _LINE.match(line)
+        if match:
+            self_us, cumulative_us, _, name = match.groups()
+            modules[name] = (int(self_us), int(cumulative_us))
+    return modules
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--budget-ms", type=float, default=1000)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    # Importing must not need a live database; a file that is never opened is enough
+    env["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'never-created.db')}"
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [os.getcwd(), env.get("PYTHONPATH")]))
+
+    runs = [measure(env) for _ in range(args.runs)]
+    best = min(runs, key=lambda modules: modules["backend.main"][1])
+    total_ms = best["backend.main"][1] / 1000
+    deferred = sorted(name for name in best if name.split(".")[0] in DEFERRED or name.startswith(DEFERRED))
+    slowest = sorted(best.items(), key=lambda item: item[1][0], reverse=True)[:args.top]
+
+    print(json.dumps({
+        "backend.main_ms": round(total_ms, 1),
+        "budget_ms": args.budget_ms,
+        "runs": args.runs,
+        "slowest_self_ms": {name: round(self_us / 1000, 1) for name, (self_us, _) in slowest},
+        "deferred_modules_imported": deferred,
+    }, indent=2))
+
+    if deferred:
+        raise SystemExit(f"backend.main imported modules that should load on first use: {', '.join(deferred)}")
+    if total_ms > args.budget_ms:
+        raise SystemExit(f"backend.main took {total_ms:.0f} ms to import, over the {args.budget_ms:.0f} ms budget")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,352 @@
+"""Mixed read/write load test for the API, with local stand-ins for Gemini and Translate.
+
+Seeds `--places` synthetic places (English and Telugu, 150-450 word stories) and
+`--users` contributors, swaps the AI model and the translator for fakes that only
+sleep, then drives the app in-process at each `--concurrency` level for `--duration`
+seconds. Every virtual client picks its next request from the scenario's weighted mix.
+Prints one JSON document with throughput, p50/p95/p99 latency, status codes and SQL
+statements per request, overall and per operation. `--output` saves it and
+`--baseline` compares against a saved run.
+
+    python -m benchmarks.bench_load --scenario mixed --concurrency 1,10,50 --duration 15
+    python -m benchmarks.bench_load --mix list=70,create=30 --output run.json --baseline previous.json
+    python -m benchmarks.bench_load --database-url postgresql://localhost/bench --places 100000
+
+Requests run inside this process, so background tasks (translating a new place) are
+part of POST /places/ latency, and client and server share one event loop.
+Runs with the same `--seed` issue the same request sequence per client.
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta
+
+REGIONS = ["Warangal", "Hyderabad", "Karimnagar", "Nalgonda", "Medak", "Adilabad", "Khammam", "Mahabubnagar", "Nizamabad"]
+TYPES = ["Fortress", "Gadi", "Traditional Home", "Temple", "Palace", "Stepwell"]
+ERAS = ["Kakatiya (12th-14th c.)", "Qutb Shahi (16th-17th c.)", "Asaf Jahi (18th-20th c.)", "Satavahana (2nd c. BCE)"]
+TAGS = ["Stone", "Granite", "Courtyard", "Carvings", "Ruins", "Restored", "Lime mortar", "Teak", "Fresco"]
+ENGLISH_WORDS = (
+    "the fort walls rose above granite hills where kakatiya kings held court and merchants "
+    "crossed the river with cotton and pearls while villagers gathered in the courtyard for "
+    "festivals under carved pillars of the old gadi whose teak doors still bear the marks of siege"
+).split()
+TELUGU_WORDS = (
+    "కోట గోడలు రాతి కొండల పైన నిలిచాయి కాకతీయ రాజులు ఇక్కడ సభ నిర్వహించారు గ్రామస్తులు "
+    "పండుగలకు ప్రాంగణంలో చేరేవారు చెక్కిన స్తంభాలు పాత గడి తలుపులు వరంగల్ చరిత్ర దేవాలయం"
+).split()
+TELUGU_NAMES = ["కోట", "గడి", "దేవాలయం", "బావి", "మహల్"]
+
+# Telangana, for coordinates and /places/nearby
+SOUTH, WEST, NORTH, EAST = 15.8, 77.2, 19.9, 81.3
+
+PASSWORD = "bench password 123"
+
+SCENARIOS = {
+    "read": {"list": 45, "filter": 15, "search": 20, "nearby": 10, "facets": 5, "list_te": 5},
+    "mixed": {"list": 35, "filter": 10, "search": 10, "nearby": 5, "facets": 5, "list_te": 5, "create": 15, "login": 5, "ai": 10},
+    "write": {"create": 80, "list": 20},
+}
+
+# Operation -> route template, for the SQL statement counts kept by backend.metrics
+ROUTES = {
+    "list": ("GET", "/places/"), "filter": ("GET", "/places/"), "list_te": ("GET", "/places/"),
+    "search": ("GET", "/places/search"), "nearby": ("GET", "/places/nearby"), "facets": ("GET", "/places/facets"),
+    "create": ("POST", "/places/"), "login": ("POST", "/login"), "ai": ("POST", "/ai/generate-story"),
+}
+
+
+def synthetic_place(rng: random.Random, i: int) -> dict:
+    telugu = rng.random() < 0.5
+    region = rng.choice(REGIONS)
+    words = TELUGU_WORDS if telugu else ENGLISH_WORDS
+    latitude, longitude = rng.uniform(SOUTH, NORTH), rng.uniform(WEST, EAST)
+    return {
+        "name": f"{region} {rng.choice(TELUGU_NAMES)} {i}" if telugu else f"{region} {rng.choice(TYPES)} {i}",
+        "type": rng.choice(TYPES),
+        "region": region,
+        "area": f"Mandal {rng.randint(1, 60)}",
+        "era": rng.choice(ERAS),
+        "story": " ".join(rng.choice(words) for _ in range(rng.randint(150, 450))),
+        "tags": ", ".join(rng.sample(TAGS, rng.randint(1, 3))),
+        "latitude": latitude,
+        "longitude": longitude,
+    }
+
+
+def seed(places: int, users: int, rng: random.Random):
+    from sqlalchemy import insert
+    from backend import database, facets, models, versioning
+    from backend.geohash import encode
+    from backend.migrate import init_db
+    from backend.passwords import hash_password
+
+    engine = database.get_engine()
+    models.Base.metadata.drop_all(engine)
+    init_db(engine)
+    hashed = hash_password(PASSWORD) # one hash shared by every bench user keeps seeding fast
+    now = datetime.utcnow()
+    with engine.begin() as conn:
+        conn.execute(insert(models.User.__table__), [
+            {"username": f"bench_user_{u}", "hashed_password": hashed, "contributions": 0} for u in range(users)
+        ])
+        user_ids = [row.id for row in conn.execute(models.User.__table__.select())]
+        for start in range(0, places, 2000):
+            rows = []
+            for i in range(start, min(start + 2000, places)):
+                place = synthetic_place(rng, i)
+                created = now - timedelta(seconds=places - i)
+                rows.append({
+                    **place, "geohash": encode(place["latitude"], place["longitude"]),
+                    "contributor_id": rng.choice(user_ids), "created_at": created, "updated_at": created,
+                })
+            conn.execute(insert(models.Place.__table__), rows)
+    with database.SessionLocal() as db:
+        facets.rebuild(db)
+        versioning.bump(db)
+        db.commit()
+
+
+def request_for(op: str, rng: random.Random, counter: int, tokens: list):
+    """Returns (method, path, kwargs) for one operation."""
+    if op == "list":
+        return "GET", "/places/", {"params": {"limit": 20}}
+    if op == "list_te":
+        return "GET", "/places/", {"params": {"limit": 20, "lang": "te"}}
+    if op == "filter":
+        return "GET", "/places/", {"params": {"limit": 20, "region": rng.choice(REGIONS), "type": rng.choice(TYPES)}}
+    if op == "search":
+        return "GET", "/places/search", {"params": {"q": rng.choice(ENGLISH_WORDS + TELUGU_WORDS), "limit": 20}}
+    if op == "nearby":
+        params = {"lat": rng.uniform(SOUTH, NORTH), "lon": rng.uniform(WEST, EAST), "radius_km": 25}
+        return "GET", "/places/nearby", {"params": params}
+    if op == "facets":
+        return "GET", "/places/facets", {}
+    if op == "create":
+        _, token = rng.choice(tokens)
+        place = synthetic_place(rng, 10_000_000 + counter)
+        return "POST", "/places/", {"json": place, "headers": {"Authorization": f"Bearer {token}"}}
+    if op == "login":
+        user, _ = rng.choice(tokens)
+        return "POST", "/login", {"data": {"username": user, "password": PASSWORD}}
+    if op == "ai":
+        # Unique points, so every call misses the story cache and reaches the model
+        place = rng.choice(REGIONS)
+        points = [f"Built around {rng.randint(1000, 1900)} CE", f"Visited {counter} times", rng.choice(ENGLISH_WORDS)]
+        return "POST", "/ai/generate-story", {"json": {"place_name": place, "points": points}}
+    raise ValueError(f"Unknown operation: {op}")
+
+
+def percentile(samples, q):
+    """Nearest-rank percentile of an already sorted list."""
+    return samples[max(math.ceil(q * len(samples)) - 1, 0)]
+
+
+def summarize(latencies, statuses, seconds):
+    latencies = sorted(latencies)
+    errors = sum(count for status, count in statuses.items() if status >= 400)
+    summary = {
+        "requests": len(latencies),
+        "errors": errors,
+        "throughput_rps": round(len(latencies) / seconds, 1),
+        "statuses": {str(status): count for status, count in sorted(statuses.items())},
+    }
+    if latencies:
+        summary["latency_ms"] = {
+            "p50": round(percentile(latencies, 0.50), 2),
+            "p95": round(percentile(latencies, 0.95), 2),
+            "p99": round(percentile(latencies, 0.99), 2),
+            "max": round(latencies[-1], 2),
+        }
+    return summary
+
+
+def query_totals():
+    from backend import metrics
+    return {
+        key: (metrics.DB_QUERIES_PER_REQUEST.count(*key), metrics.DB_QUERIES_PER_REQUEST.total(*key))
+        for key in set(ROUTES.values())
+    }
+
+
+async def run_level(client, mix, concurrency, duration, warmup, tokens, seed_value):
+    ops, weights = zip(*mix.items())
+    latencies = defaultdict(list)
+    statuses = defaultdict(Counter)
+    counter = 0
+    started = time.perf_counter()
+    measure_from = started + warmup
+    deadline = measure_from + duration
+    queries_before = None
+
+    async def client_loop(client_id):
+        nonlocal counter, queries_before
+        rng = random.Random(seed_value * 100_003 + client_id)
+        while True:
+            now = time.perf_counter()
+            if now >= deadline:
+                return
+            if queries_before is None and now >= measure_from:
+                queries_before = query_totals()
+            op = rng.choices(ops, weights)[0]
+            counter += 1
+            method, path, kwargs = request_for(op, rng, counter, tokens)
+            sent = time.perf_counter()
+            try:
+                status = (await client.request(method, path, **kwargs)).status_code
+            except Exception:
+                status = 599 # transport failure
+            done = time.perf_counter()
+            if sent >= measure_from and done <= deadline:
+                latencies[op].append((done - sent) * 1000)
+                statuses[op][status] += 1
+
+    await asyncio.gather(*[client_loop(i) for i in range(concurrency)])
+    queries_after = query_totals()
+    before = queries_before or {key: (0, 0.0) for key in queries_after}
+
+    per_op = {}
+    for op in ops:
+        per_op[op] = summarize(latencies[op], statuses[op], duration)
+    # Statement counts are per route, so operations sharing a route share the figure
+    for op, route in ROUTES.items():
+        if op in per_op:
+            count = queries_after[route][0] - before[route][0]
+            total = queries_after[route][1] - before[route][1]
+            per_op[op]["db_queries_per_request"] = round(total / count, 2) if count else None
+
+    all_latencies = [sample for op in ops for sample in latencies[op]]
+    all_statuses = sum(statuses.values(), Counter())
+    return {"concurrency": concurrency, **summarize(all_latencies, all_statuses, duration), "operations": per_op}
+
+
+async def login_all(client, users):
+    tokens = []
+    for u in range(users):
+        username = f"bench_user_{u}"
+        response = await client.post("/login", data={"username": username, "password": PASSWORD})
+        response.raise_for_status()
+        tokens.append((username, response.json()["access_token"]))
+    return tokens
+
+
+async def run_all(args, mix):
+    import httpx
+    from backend import database, main
+    from backend.passwords import password_hasher
+
+    transport = httpx.ASGITransport(app=main.app)
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+            tokens = await login_all(client, args.users)
+            return [
+                await run_level(client, mix, concurrency, args.duration, args.warmup, tokens, args.seed)
+                for concurrency in args.concurrency
+            ]
+    finally:
+        password_hasher.shutdown()
+        if database.async_engine is not None:
+            await database.async_engine.dispose()
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(result, baseline):
+    """Relative change of throughput and p95 per (concurrency, operation) against a saved run."""
+    previous = {level["concurrency"]: level for level in baseline.get("levels", [])}
+    changes = []
+    for level in result["levels"]:
+        old = previous.get(level["concurrency"])
+        if old is None:
+            continue
+        pairs = [("all", level, old)] + [
+            (op, stats, old["operations"][op]) for op, stats in level["operations"].items() if op in old.get("operations", {})
+        ]
+        for op, new_stats, old_stats in pairs:
+            change = {"concurrency": level["concurrency"], "operation": op}
+            if old_stats.get("throughput_rps"):
+                change["throughput_change_pct"] = round(100 * (new_stats["throughput_rps"] / old_stats["throughput_rps"] - 1), 1)
+            if "latency_ms" in new_stats and "latency_ms" in old_stats and old_stats["latency_ms"]["p95"]:
+                change["p95_change_pct"] = round(100 * (new_stats["latency_ms"]["p95"] / old_stats["latency_ms"]["p95"] - 1), 1)
+            changes.append(change)
+    return changes
+
+
+def parse_mix(value: str) -> dict:
+    mix = {}
+    for part in value.split(","):
+        op, _, weight = part.partition("=")
+        if op.strip() not in ROUTES:
+            raise argparse.ArgumentTypeError(f"Unknown operation {op.strip()!r}; choose from {', '.join(ROUTES)}")
+        mix[op.strip()] = float(weight or 1)
+    return mix
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", help="Defaults to a temporary SQLite file. The database is dropped and reseeded")
+    parser.add_argument("--places", type=int, default=5000)
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--scenario", choices=sorted(SCENARIOS), default="mixed")
+    parser.add_argument("--mix", type=parse_mix, help="Overrides --scenario, e.g. list=60,search=20,create=20")
+    parser.add_argument("--concurrency", type=lambda v: [int(c) for c in v.split(",")], default=[1, 10, 50],
+                        help="Comma-separated virtual client counts, one run each")
+    parser.add_argument("--duration", type=float, default=10, help="Measured seconds per concurrency level")
+    parser.add_argument("--warmup", type=float, default=2, help="Unmeasured seconds before each level")
+    parser.add_argument("--ai-latency", type=float, default=1.5, help="Seconds the fake Gemini model takes per story")
+    parser.add_argument("--translate-latency", type=float, default=0.15, help="Seconds the fake translator takes per batch")
+    parser.add_argument("--bcrypt-rounds", type=int, default=None, help="Defaults to BCRYPT_ROUNDS (12)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="Also write the JSON result to this file")
+    parser.add_argument("--baseline", help="A previous --output file to compare against")
+    args = parser.parse_args()
+
+    # The app reads its configuration at import time
+    os.environ["DATABASE_URL"] = args.database_url or f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+    os.environ["GEOCODING_PROVIDER"] = "none"
+    os.environ["DB_INIT_ON_STARTUP"] = "false"
+    if args.bcrypt_rounds:
+        os.environ["BCRYPT_ROUNDS"] = str(args.bcrypt_rounds)
+
+    from benchmarks import fakes
+    from backend import database, passwords
+
+    mix = args.mix or SCENARIOS[args.scenario]
+    seed(args.places, args.users, random.Random(args.seed))
+    fakes.install(ai_latency=args.ai_latency, translate_latency=args.translate_latency)
+
+    result = {
+        "config": {
+            "scenario": "custom" if args.mix else args.scenario, "mix": mix, "places": args.places, "users": args.users,
+            "duration_s": args.duration, "warmup_s": args.warmup, "ai_latency_s": args.ai_latency,
+            "translate_latency_s": args.translate_latency, "bcrypt_rounds": passwords.BCRYPT_ROUNDS, "seed": args.seed,
+        },
+        "environment": {
+            "database": database.get_engine().url.get_backend_name(), "python": platform.python_version(),
+            "platform": platform.platform(), "cpus": os.cpu_count(), "git_revision": git_revision(),
+            "started_at": datetime.utcnow().isoformat(timespec="seconds") + "Z",
+        },
+        "levels": asyncio.run(run_all(args, mix)),
+    }
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            result["baseline"] = {"file": args.baseline, "changes": compare(result, json.load(f))}
+
+    output = json.dumps(result, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+    sys.stdout.write(output + "\n")
@@ -0,0 +1,126 @@
+"""Login flood benchmark: bcrypt in the request threadpool vs. the password process pool.
+
+Fires `--logins` concurrent logins at the app in-process while a probe keeps calling
+GET /places/, once against the previous inline handler and once against /login.
+Reports successful logins/sec, 503 rejections and the probe's p50/p99 latency.
+
+    python -m benchmarks.bench_login --logins 400 --concurrency 100
+    python -m benchmarks.bench_login --database-url postgresql://localhost/bench
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import tempfile
+import time
+
+import httpx
+from fastapi import Depends, HTTPException
+from fastapi.security import OAuth2PasswordRequestForm
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import NullPool
+
+from backend import database, main, models, passwords
+
+USERNAME, PASSWORD = "bench_user", "correct horse battery staple"
+
+
+def legacy_login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(main.get_db)):
+    # The original handler: bcrypt runs on a request thread
+    user = db.query(models.User).filter(models.User.username == form_data.username).first()
+    if not user or not passwords.get_pwd_context().verify(form_data.password, user.hashed_password):
+        raise HTTPException(status_code=401, detail="Incorrect username or password")
+    return {"username": user.username, "message": "Login successful"}
+
+
+async def flood(client, path, logins, concurrency):
+    statuses = []
+    slots = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with slots:
+            response = await client.post(path, data={"username": USERNAME, "password": PASSWORD})
+            statuses.append(response.status_code)
+
+    started = time.perf_counter()
+    await asyncio.gather(*[one() for _ in range(logins)])
+    return statuses, time.perf_counter() - started
+
+
+async def probe(client, done: asyncio.Event):
+    samples = []
+    while not done.is_set():
+        started = time.perf_counter()
+        await client.get("/places/", params={"limit": 20})
+        samples.append((time.perf_counter() - started) * 1000)
+        await asyncio.sleep(0.01)
+    return samples
+
+
+async def run(name, path, logins, concurrency):
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=300) as client:
+        done = asyncio.Event()
+        probe_task = asyncio.create_task(probe(client, done))
+        statuses, seconds = await flood(client, path, logins, concurrency)
+        done.set()
+        samples = sorted(await probe_task)
+    return {
+        "name": name,
+        "logins_ok": statuses.count(200),
+        "rejected_503": statuses.count(503),
+        "logins_per_sec": round(statuses.count(200) / seconds, 1),
+        "places_p50_ms": round(statistics.median(samples), 1) if samples else None,
+        "places_p99_ms": round(samples[max(int(len(samples) * 0.99) - 1, 0)], 1) if samples else None,
+        "probe_requests": len(samples),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", help="Defaults to a temporary SQLite file")
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=100)
+    args = parser.parse_args()
+
+    url = args.database_url or f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+    connect_args = {"check_same_thread": False} if url.startswith("sqlite") else {}
+    engine = create_engine(url, connect_args=connect_args)
+    models.Base.metadata.drop_all(engine)
+    models.Base.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine)
+    with Session() as db:
+        db.add(models.User(username=USERNAME, hashed_password=passwords.hash_password(PASSWORD)))
+        db.commit()
+
+    # Each run has its own event loop, so async connections are not pooled across runs
+    AsyncSession = async_sessionmaker(create_async_engine(database.async_url(url), poolclass=NullPool), expire_on_commit=False)
+
+    def get_db():
+        with Session() as db:
+            yield db
+
+    async def get_async_db():
+        async with AsyncSession() as db:
+            yield db
+
+    main.app.dependency_overrides[main.get_db] = get_db
+    main.app.dependency_overrides[main.get_async_db] = get_async_db
+    main.app.post("/bench/login-inline")(legacy_login)
+
+    # Start the worker processes before timing anything
+    asyncio.run(passwords.password_hasher.hash("warm-up"))
+    results = [
+        asyncio.run(run("before (bcrypt on request threads)", "/bench/login-inline", args.logins, args.concurrency)),
+        asyncio.run(run("after (process pool)", "/login", args.logins, args.concurrency)),
+    ]
+    passwords.password_hasher.shutdown()
+    print(json.dumps({
+        "bcrypt_rounds": passwords.BCRYPT_ROUNDS,
+        "password_workers": passwords.PASSWORD_WORKERS,
+        "queue_depth": passwords.PASSWORD_QUEUE_DEPTH,
+        "results": results,
+    }, indent=2))
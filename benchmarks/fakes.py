@@ -0,0 +1,69 @@
+"""Local stand-ins for Gemini and Google Translate with configurable latency.
+
+They sleep instead of calling out, so load tests measure the backend rather than
+the network or a quota. Install them with `install(...)` after importing backend.
+"""
+import time
+from typing import List
+
+
+class _Chunk:
+    def __init__(self, text: str):
+        self.text = text
+
+
+class FakeGeminiModel:
+    """Answers `generate_content` like genai.GenerativeModel after `latency` seconds.
+
+    With stream=True the same total latency is spread over `chunks` pieces, the
+    first one arriving after `first_chunk_latency`.
+    """
+
+    def __init__(self, latency: float = 1.5, first_chunk_latency: float = 0.4, chunks: int = 8, words: int = 220):
+        self.latency = latency
+        self.first_chunk_latency = min(first_chunk_latency, latency)
+        self.chunks = max(1, chunks)
+        self.words = words
+        self.calls = 0
+
+    def _story(self, prompt: str) -> str:
+        return " ".join(["Once", "upon", "a", "time"] + ["the fort stood"] * (self.words // 3))
+
+    def generate_content(self, prompt: str, stream: bool = False):
+        self.calls += 1
+        story = self._story(prompt)
+        if not stream:
+            time.sleep(self.latency)
+            return _Chunk(story)
+        return self._stream(story)
+
+    def _stream(self, story: str):
+        size = -(-len(story) // self.chunks)
+        rest = (self.latency - self.first_chunk_latency) / max(self.chunks - 1, 1)
+        for i in range(self.chunks):
+            time.sleep(self.first_chunk_latency if i == 0 else rest)
+            yield _Chunk(story[i * size:(i + 1) * size])
+
+
+class FakeTranslator:
+    """translate_batch that takes `latency` seconds per request plus `per_segment` per string."""
+
+    def __init__(self, latency: float = 0.15, per_segment: float = 0.002):
+        self.latency = latency
+        self.per_segment = per_segment
+        self.calls = 0
+
+    def translate_batch(self, texts: List[str], target: str, source: str = "en") -> List[str]:
+        self.calls += 1
+        time.sleep(self.latency + self.per_segment * len(texts))
+        return [f"[{target}] {text}" for text in texts]
+
+
+def install(ai_latency: float, translate_latency: float):
+    """Points the story generator and the translation hooks at the fakes. Returns (model, translator)."""
+    from backend import ai, translation
+    model = FakeGeminiModel(latency=ai_latency, first_chunk_latency=min(0.4, ai_latency))
+    translator = FakeTranslator(latency=translate_latency)
+    ai.story_generator.model = model
+    translation.set_translator(translator)
+    return model, translator
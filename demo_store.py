@@ -0,0 +1,278 @@
+# demo_store.py
+"""Storage for the 1.py demo: a stories.json snapshot plus an append-only JSONL journal.
+
+A submission costs one small fsync'd append. Startup loads the snapshot and replays
+the journal tail. Once the journal grows past `compact_every` records it is folded
+back into the snapshot.
+"""
+import json
+import os
+import threading
+from collections import Counter
+from collections.abc import Mapping
+from contextlib import contextmanager
+from types import MappingProxyType
+
+try:
+    import fcntl
+except ImportError: # Windows: no advisory locks, single-process use only
+    fcntl = None
+
+
+def _fsync_dir(path: str):
+    """Makes a rename or a new file in `path`'s directory durable. Windows cannot open directories; skipped there."""
+    if os.name != "posix":
+        return
+    fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _fsync_write(path: str, data: bytes):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    _fsync_dir(path)
+
+
+class JournalStore:
+    def __init__(self, snapshot_path: str = "stories.json", journal_path: str = None,
+                 compact_every: int = 500, default_places: dict = None):
+        self.snapshot_path = snapshot_path
+        self.journal_path = journal_path or os.path.splitext(snapshot_path)[0] + ".journal.jsonl"
+        self.compact_every = compact_every
+        self.default_places = default_places or {}
+        self.places = {}
+        self._records = 0 # journal records since the last compaction
+        self._offset = 0 # bytes of the journal already replayed
+        self._journal_id = None # (device, inode); changes when compaction starts a new journal
+        self._thread_lock = threading.Lock() # flock only orders processes; this orders threads
+        with self._lock(exclusive=True):
+            self._reload()
+
+    @contextmanager
+    def _lock(self, exclusive: bool):
+        with self._thread_lock, open(f"{self.journal_path}.lock", "a") as lock_file:
+            if fcntl:
+                fcntl.flock(lock_file, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                yield
+            finally:
+                if fcntl:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _read_snapshot(self) -> dict:
+        try:
+            with open(self.snapshot_path, "r", encoding="utf-8") as f:
+                content = f.read().strip()
+            if content:
+                return json.loads(content)
+        except (OSError, json.JSONDecodeError):
+            pass
+        # Missing, empty or invalid: fall back to the defaults and recreate the file
+        _fsync_write(self.snapshot_path, json.dumps(self.default_places, ensure_ascii=False, indent=2).encode("utf-8"))
+        return dict(self.default_places)
+
+    def _reload(self):
+        self.places = self._read_snapshot()
+        self._records = 0
+        self._offset = 0
+        self._journal_id = None
+        self._replay_tail()
+
+    def _replay_tail(self) -> list:
+        """Applies journal records written since the last call. Returns the ids they changed."""
+        try:
+            stat = os.stat(self.journal_path)
+        except FileNotFoundError:
+            return []
+        journal_id = (stat.st_dev, stat.st_ino)
+        if self._journal_id is not None and (journal_id != self._journal_id or stat.st_size < self._offset):
+            # Compacted by another process: the snapshot now holds everything we had
+            self._reload()
+            return list(self.places)
+        self._journal_id = journal_id
+        if stat.st_size == self._offset:
+            return []
+
+        applied = []
+        with open(self.journal_path, "rb") as f:
+            f.seek(self._offset)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break # A torn write from a crash; everything before it is intact
+                record = json.loads(line)
+                self.places[record["id"]] = record["place"]
+                self._offset += len(line)
+                applied.append(record["id"])
+        self._records += len(applied)
+        return applied
+
+    def refresh(self) -> list:
+        """Picks up submissions appended by other sessions or processes. Returns the ids that changed."""
+        with self._lock(exclusive=False):
+            return self._replay_tail()
+
+    def append(self, place_id: str, place: dict) -> list:
+        """Durably appends one record. Returns the ids that changed, including any picked up from others."""
+        line = json.dumps({"id": place_id, "place": place}, ensure_ascii=False).encode("utf-8") + b"\n"
+        with self._lock(exclusive=True):
+            changed = self._replay_tail()
+            created = self._journal_id is None # No journal file yet
+            with open(self.journal_path, "ab") as f:
+                # Drop a torn record left by a crash so the new one starts on its own line
+                f.truncate(self._offset)
+                f.write(line)
+                f.flush()
+                os.fsync(f.fileno())
+            if created:
+                _fsync_dir(self.journal_path)
+            changed += self._replay_tail()
+            if self._records >= self.compact_every:
+                self._compact()
+        return changed
+
+    def compact(self):
+        with self._lock(exclusive=True):
+            self._replay_tail()
+            self._compact()
+
+    def _compact(self):
+        # Caller holds the exclusive lock. Snapshot first, then swap in an empty journal,
+        # so a crash in between only leaves records that are replayed twice (idempotent).
+        _fsync_write(self.snapshot_path, json.dumps(self.places, ensure_ascii=False, indent=2).encode("utf-8"))
+        _fsync_write(self.journal_path, b"")
+        self._records = 0
+        self._offset = 0
+        self._journal_id = None
+        self._replay_tail()
+
+
+FACETS = ("region", "type")
+
+
+class PlacesView(Mapping):
+    """A read-only view of the places: a large base mapping plus a small overlay of recent changes.
+
+    Neither is ever mutated once published, so a view stays consistent however long a
+    reader holds it. Writers copy only the overlay, and fold it into a new base once it
+    outgrows the square root of the base, so a write costs O(sqrt(N)) amortised, not O(N).
+    """
+
+    __slots__ = ("_base", "_recent")
+
+    def __init__(self, base: dict, recent: dict = None):
+        self._base = base
+        self._recent = recent or {}
+
+    def with_changes(self, changes: dict) -> "PlacesView":
+        recent = {**self._recent, **changes}
+        if len(recent) ** 2 > max(len(self._base), 4096):
+            return PlacesView({**self._base, **recent})
+        return PlacesView(self._base, recent)
+
+    def __getitem__(self, place_id):
+        if place_id in self._recent:
+            return self._recent[place_id]
+        return self._base[place_id]
+
+    def __iter__(self):
+        # Same order as one dict updated in place: changed places keep their position
+        yield from self._base
+        for place_id in self._recent:
+            if place_id not in self._base:
+                yield place_id
+
+    def __len__(self):
+        return len(self._base) + sum(1 for place_id in self._recent if place_id not in self._base)
+
+    def __contains__(self, place_id):
+        return place_id in self._recent or place_id in self._base
+
+
+class SharedPlaceStore:
+    """The demo archive held once per process and shared by every Streamlit session.
+
+    Readers get immutable snapshots and never copy. Writers append to the journal
+    (which has its own locks) without holding the store lock, then publish a new view
+    carrying just their changes. `version` increases with every change, so sessions can
+    cheaply tell when they have missed submissions.
+    """
+
+    def __init__(self, journal: JournalStore, users: dict):
+        self._journal = journal
+        self._lock = threading.Lock()
+        self.version = 0
+        self._places = PlacesView(dict(journal.places))
+        self._counts = {facet: Counter() for facet in FACETS}
+        for place in self._places.values():
+            self._count(place, 1)
+        self._publish_facets()
+        self._users = MappingProxyType({key: MappingProxyType(dict(user)) for key, user in users.items()})
+
+    def snapshot(self):
+        """Returns (version, places, users) as one consistent, read-only view."""
+        with self._lock:
+            return self.version, self._places, self._users
+
+    def facet_counts(self, facet: str):
+        """[(value, count), ...] for "region" or "type", most common first. Computed once per change."""
+        return self.facets.get(facet, [])
+
+    def refresh(self) -> int:
+        """Picks up submissions written by other processes. Returns the current version."""
+        changed = self._journal.refresh()
+        with self._lock:
+            if changed:
+                self._apply(changed)
+            return self.version
+
+    def ensure_user(self, key: str, name: str):
+        if key in self._users:
+            return
+        with self._lock:
+            if key not in self._users:
+                self._set_user(key, {"name": name, "contributions": 0, "badge": "New Contributor ✨"})
+
+    def add_place(self, place_id: str, place: dict, contributor_key: str):
+        # The fsync'd append happens before taking the lock, so readers never wait on the disk
+        changed = self._journal.append(place_id, place)
+        with self._lock:
+            self._apply(changed)
+            user = dict(self._users.get(contributor_key, {"name": contributor_key, "badge": "New Contributor ✨"}))
+            user["contributions"] = user.get("contributions", 0) + 1
+            self._set_user(contributor_key, user)
+
+    def _apply(self, place_ids):
+        # Caller holds the lock. Takes the journal's latest record for each id rather than
+        # the one appended, so writers that get here out of order still end on the newest.
+        changes = {}
+        for place_id in dict.fromkeys(place_ids):
+            place = self._journal.places[place_id]
+            if place_id in self._places:
+                self._count(self._places[place_id], -1)
+            self._count(place, 1)
+            changes[place_id] = place
+        self._places = self._places.with_changes(changes)
+        self._publish_facets()
+        self.version += 1
+
+    def _count(self, place: dict, delta: int):
+        for facet, counter in self._counts.items():
+            value = place.get(facet)
+            if value:
+                counter[value] += delta
+                if not counter[value]:
+                    del counter[value]
+
+    def _publish_facets(self):
+        # Sorting the distinct values is cheap; the places themselves are never rescanned
+        self.facets = MappingProxyType({facet: tuple(counter.most_common()) for facet, counter in self._counts.items()})
+
+    def _set_user(self, key: str, user: dict):
+        self._users = MappingProxyType({**self._users, key: MappingProxyType(user)})
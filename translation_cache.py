@@ -0,0 +1,97 @@
+# translation_cache.py
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+# Google Translate v2 accepts at most 128 segments per request
+MAX_SEGMENTS_PER_REQUEST = 128
+
+
+class TranslationCache:
+    """Translations persisted in a local SQLite file.
+
+    Shared by every Streamlit process on the machine and kept across restarts.
+    Once more than `max_entries` rows exist, the least recently used are evicted.
+    """
+
+    def __init__(self, path: str, max_entries: int = 50_000):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        with self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS translations ("
+                " key TEXT PRIMARY KEY, target TEXT NOT NULL, translated TEXT NOT NULL, last_used REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS ix_translations_last_used ON translations (last_used)")
+
+    @staticmethod
+    def _key(text: str, target: str) -> str:
+        return hashlib.sha256(f"{target}\0{text}".encode("utf-8")).hexdigest()
+
+    def get_many(self, texts, target: str) -> dict:
+        keys = {self._key(text, target): text for text in texts}
+        found = {}
+        with self._lock, self._conn:
+            key_list = list(keys)
+            # Stay under SQLite's bound-parameter limit
+            for i in range(0, len(key_list), 500):
+                chunk = key_list[i:i + 500]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT key, translated FROM translations WHERE key IN ({placeholders})", chunk
+                ).fetchall()
+                for key, translated in rows:
+                    found[keys[key]] = translated
+            if found:
+                now = time.time()
+                self._conn.executemany(
+                    "UPDATE translations SET last_used = ? WHERE key = ?",
+                    [(now, self._key(text, target)) for text in found],
+                )
+        return found
+
+    def put_many(self, translations: dict, target: str):
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO translations (key, target, translated, last_used) VALUES (?, ?, ?, ?)",
+                [(self._key(text, target), target, translated, now) for text, translated in translations.items()],
+            )
+            (count,) = self._conn.execute("SELECT COUNT(*) FROM translations").fetchone()
+            if count > self.max_entries:
+                self._conn.execute(
+                    "DELETE FROM translations WHERE key IN "
+                    "(SELECT key FROM translations ORDER BY last_used LIMIT ?)",
+                    (count - self.max_entries,),
+                )
+
+
+def translate_batch(client, cache: TranslationCache, texts, target_language: str, source_language: str = "en") -> dict:
+    """Returns {text: translation} for `texts`, calling the API only for uncached strings."""
+    unique = list(dict.fromkeys(text for text in texts if text))
+    result = cache.get_many(unique, target_language)
+    missing = [text for text in unique if text not in result]
+    if not missing or client is None:
+        return {**{text: text for text in missing}, **result}
+
+    fresh = {}
+    try:
+        for i in range(0, len(missing), MAX_SEGMENTS_PER_REQUEST):
+            chunk = missing[i:i + MAX_SEGMENTS_PER_REQUEST]
+            response = client.translate(chunk, target_language=target_language, source_language=source_language)
+            for text, item in zip(chunk, response):
+                fresh[text] = item["translatedText"]
+    except Exception as e:
+        print(f"Translation API failed: {e}")
+    if fresh:
+        cache.put_many(fresh, target_language)
+    result.update(fresh)
+    # Anything that could not be translated falls back to the original text
+    return {**{text: text for text in missing}, **result}